@@ -13,11 +13,19 @@
     admin.backup()
     admin.restore(filename)
 
+    # rebuild the index with the current mapping
+    admin.remap()
+
     # update all documents
     admin.refresh()
     # check all uptime status
     admin.check()
 
+    # compress the stored documents again
+    admin.recompress()
+    # with a new dictionary trained on them
+    admin.recompress(train=True)
+
     See below for additional usage.
 
 """
@@ -28,8 +36,9 @@ from datetime import datetime
 
 import boto3
 
-from controller import SmartAPI
-from utils import indices
+from controller import SmartAPI, refresh_schemas
+from utils import decoder, indices
+from utils.sessions import session
 
 logging.basicConfig(level="INFO")
 
@@ -55,7 +64,7 @@ def save_to_s3(mapping, filename=None, bucket="smartapi"):
 
 def _backup():
     smartapis = []
-    for smartapi in SmartAPI.get_all(1000):
+    for smartapi in SmartAPI.get_all():
         smartapis.append({
             "url": smartapi.url,
             "username": smartapi.username,
@@ -77,20 +86,33 @@ def backup_to_s3(filename=None, bucket="smartapi"):
     save_to_s3(smartapis, filename, bucket)
 
 
+def _save(smartapis, logger=logging, reindex=False):
+    for _id, error in SmartAPI.save_many(smartapis, reindex=reindex):
+        if error:
+            logger.error("%s: %s", _id, error)
+
+
 def _restore(smartapis):
     if indices.exists():
         logging.error("Cannot write to an existing index.")
         return
     indices.reset()
-    for smartapi in smartapis:
-        logging.info(smartapi["url"])
-        _smartapi = SmartAPI(smartapi["url"])
-        _smartapi.username = smartapi["username"]
-        _smartapi.slug = smartapi["slug"]
-        _smartapi.date_created = datetime.fromisoformat(smartapi["date_created"])
-        _smartapi.last_updated = datetime.fromisoformat(smartapi["last_updated"])
-        _smartapi.raw = smartapi["raw"].encode()  # to bytes
-        _smartapi.save()
+    # the blobs are compressed with the dictionaries
+    # in memory, removed with the index, see remap.
+    decoder.compression.save()
+
+    def _smartapis():
+        for smartapi in smartapis:
+            logging.info(smartapi["url"])
+            _smartapi = SmartAPI(smartapi["url"])
+            _smartapi.username = smartapi["username"]
+            _smartapi.slug = smartapi["slug"]
+            _smartapi.date_created = datetime.fromisoformat(smartapi["date_created"])
+            _smartapi.last_updated = datetime.fromisoformat(smartapi["last_updated"])
+            _smartapi.raw = smartapi["raw"].encode()  # to bytes
+            yield _smartapi
+
+    _save(_smartapis())
 
 
 def restore_from_s3(filename=None, bucket="smartapi"):
@@ -122,28 +144,72 @@ def restore_from_file(filename):
 
 def refresh_document():
     logger = logging.getLogger("refresh")
-    for smartapi in SmartAPI.get_all(1000):
-        logger.info(smartapi._id)
-        _status = smartapi.refresh()
-        logger.info(_status)
-        smartapi.save()
+
+    def _refresh():
+        for smartapi in SmartAPI.get_all():
+            logger.info(smartapi._id)
+            _status = smartapi.refresh()
+            logger.info(_status)
+            yield smartapi
+
+    _save(_refresh(), logger)
+    logger.info("connections %s", session.stats())
 
 
 def check_uptime():
     logger = logging.getLogger("uptime")
-    for smartapi in SmartAPI.get_all(1000):
-        logger.info(smartapi._id)
-        _status = smartapi.check()
-        logger.info(_status)
-        smartapi.save()
+
+    def _check():
+        for smartapi in SmartAPI.get_all():
+            logger.info(smartapi._id)
+            _status = smartapi.check()
+            logger.info(_status)
+            yield smartapi
+
+    _save(_check(), logger)
+    logger.info("connections %s", session.stats())
 
 
 def resave():
     # when index mappings are changed
     logger = logging.getLogger("resave")
-    for smartapi in SmartAPI.get_all(1000):
-        logger.info(smartapi._id)
-        smartapi.save()
+
+    def _resave():
+        for smartapi in SmartAPI.get_all():
+            logger.info(smartapi._id)
+            yield smartapi
+
+    _save(_resave(), logger, reindex=True)
+
+
+def remap(filename=None):
+    # when index mappings are changed incompatibly,
+    # for example objects to flattened fields, keep
+    # a backup file in case the restoration fails.
+    logger = logging.getLogger("remap")
+    logger.info("before %s", indices.stats())
+
+    smartapis = _backup()
+    save_to_file(smartapis, filename)
+    indices.delete()
+    _restore(smartapis)
+
+    indices.refresh()
+    logger.info("after %s", indices.stats())
+
+
+def recompress(train=False):
+    # after upgrading the compression of stored
+    # documents, documents compressed before are
+    # still readable, but not as small as they can be.
+    logger = logging.getLogger("recompress")
+
+    if train:
+        samples = [smartapi.raw for smartapi in SmartAPI.get_all()]
+        dictionary = decoder.compression.train(samples)
+        logger.info("dictionary %s from %s documents", dictionary.dict_id(), len(samples))
+
+    resave()
 
 
 restore = restore_from_file
@@ -155,6 +221,8 @@ check = check_uptime
 
 def routine():
     logger = logging.getLogger("routine")
+    logger.info("refresh_schemas()")
+    refresh_schemas()
     logger.info("backup_to_s3()")
     backup_to_s3()
     logger.info("refresh_document()")
@@ -0,0 +1,68 @@
+"""
+    Document Compression Benchmark
+
+    Compare the size and the decompression time of the tests
+    fixtures, as stored by gzip before, and by zstd, without
+    and with a dictionary trained on the other fixtures.
+
+    cd src
+    python -m benchmarks.compression [number]
+
+"""
+import glob
+import gzip
+import os
+import sys
+import timeit
+
+from utils import decoder
+
+dirname = os.path.dirname(__file__)
+
+PATTERNS = ('../tests/*.yml', '../tests/decoder/doc_*', '../tests/validate/*.json', '../tests/validate/*.yml')
+
+
+def main(number=200):
+
+    docs = {}
+    for pattern in PATTERNS:
+        for path in sorted(glob.glob(os.path.join(dirname, pattern))):
+            with open(path, 'rb') as file:
+                docs[os.path.basename(path)] = file.read()
+
+    plain = decoder.Compression()
+    print(f"{'':<32} {'bytes':>8} | {'gzip':>17} | {'zstd':>17} | {'zstd+dict':>17}")
+
+    totals = [0, 0, 0, 0]
+    for name, raw in docs.items():
+
+        # leave the document out of its dictionary
+        samples = [
+            doc[i:i + 4096] for key, doc in docs.items() if key != name
+            for i in range(0, len(doc), 4096)]
+        trained = decoder.Compression()
+        trained.train(samples, size=16384)
+
+        results = []
+        for compressed, decompress in (
+            (gzip.compress(raw), gzip.decompress),
+            (plain.compress(raw), plain.decompress),
+            (trained.compress(raw), trained.decompress),
+        ):
+            assert decompress(compressed) == raw
+            seconds = timeit.timeit(lambda: decompress(compressed), number=number)
+            results.append(f"{len(compressed):>7} {seconds / number * 1e6:7.1f} us")
+
+        totals[0] += len(raw)
+        totals[1] += len(gzip.compress(raw))
+        totals[2] += len(plain.compress(raw))
+        totals[3] += len(trained.compress(raw))
+        print(f"{name[:32]:<32} {len(raw):>8} | " + " | ".join(results))
+
+    print(
+        f"{'total':<32} {totals[0]:>8} | "
+        + " | ".join(f"{size:>7} {totals[0] / size:6.2f}x  " for size in totals[1:]))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
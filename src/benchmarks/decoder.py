@@ -0,0 +1,47 @@
+"""
+    Document Decoder Benchmark
+
+    Compare decoding the tests/decoder fixtures without a hint
+    of their format, the common case, by the pure python yaml
+    parser, and by decoder.to_dict, which sniffs json documents
+    and uses the libyaml bindings when they are available.
+
+    cd src
+    python -m benchmarks.decoder [number]
+
+"""
+import glob
+import os
+import sys
+import timeit
+
+import yaml
+
+from utils import decoder
+
+dirname = os.path.dirname(__file__)
+
+
+def main(number=20):
+
+    print(f"yaml loader: {decoder.SafeLoader.__name__}")
+
+    for path in sorted(glob.glob(os.path.join(dirname, '../tests/decoder/doc_*'))):
+        with open(path, 'rb') as file:
+            raw = file.read()
+        if raw.startswith(b"export default "):
+            raw = raw[len(b"export default "):]
+
+        before = timeit.timeit(lambda: yaml.load(raw, Loader=yaml.SafeLoader), number=number)
+        after = timeit.timeit(lambda: decoder.to_dict(raw), number=number)
+
+        decoder.usage.clear()
+        decoder.to_dict(raw)
+        print(
+            f"{os.path.basename(path):<20} {len(raw):>8} bytes"
+            f" | before {before / number * 1000:8.2f} ms"
+            f" | after {after / number * 1000:8.2f} ms ({next(iter(decoder.usage))})")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,155 @@
+"""
+    Index Mapping Benchmark
+
+    Index a synthetic corpus of documents, with user defined
+    paths, operations, parameters and extensions, into temporary
+    indices, with the dynamic mapping of paths the registry used
+    to have, and with the curated mapping in utils/mapping.json,
+    and compare the number of mapped fields, the index size and
+    the indexing throughput.
+
+    Requires a running elasticsearch, see ES_HOST in model.py.
+
+    cd src
+    python -m benchmarks.mapping [documents] [chunk_size]
+
+"""
+import copy
+import json
+import os
+import random
+import sys
+import time
+
+from elasticsearch.helpers import streaming_bulk
+from elasticsearch_dsl import Index, connections
+
+from model import APIDoc
+from utils.indices import stats
+
+INDEX = 'smartapi_benchmark'
+
+dirname = os.path.dirname(__file__)
+
+with open(os.path.join(dirname, '../utils/mapping.json'), 'r') as file:
+    MAPPING = json.load(file)
+
+
+def legacy(mapping):
+    # before utils/mapping.json flattened or
+    # disabled the user defined spec trees.
+    mapping = copy.deepcopy(mapping)
+    mapping["dynamic_templates"] = [
+        template for template in mapping["dynamic_templates"]
+        if "flatten_extension_objects" not in template
+    ]
+    for key in ("paths", "parameters", "responses", "securityDefinitions", "security"):
+        mapping["properties"].pop(key)
+    mapping["properties"]["paths"] = {"properties": {"pathitem": {"type": "object"}}}
+    return mapping
+
+
+random.seed(0)
+
+METHODS = ('get', 'post', 'put', 'delete')
+WORDS = [
+    ''.join(random.choice('abcdefghijklmnop') for _ in range(random.randint(3, 10)))
+    for _ in range(2000)
+]
+
+
+def words(length):
+    return ' '.join(random.choice(WORDS) for _ in range(length))
+
+
+def operation():
+    return {
+        "summary": words(6),
+        "operationId": random.choice(WORDS),
+        "tags": [random.choice(WORDS)],
+        "parameters": [{
+            "name": random.choice(WORDS),
+            "in": "query",
+            "description": words(10),
+            "schema": {"type": "string"}
+        } for _ in range(random.randint(1, 5))],
+        "responses": {
+            str(random.choice((200, 400, 404))): {
+                "description": words(4),
+                "content": {"application/json": {"schema": {"type": "object"}}}
+            }
+        },
+        # user defined keys, the source of mapping growth
+        "x-" + random.choice(WORDS): {
+            random.choice(WORDS): words(2) for _ in range(3)
+        }
+    }
+
+
+def document():
+    return {
+        "openapi": "3.0.0",
+        "info": {
+            "title": words(3),
+            "description": words(30),
+            "version": "1.0.0"
+        },
+        "tags": [{"name": random.choice(WORDS)}],
+        "paths": [{
+            "path": "/" + random.choice(WORDS),
+            "pathitem": {
+                method: operation()
+                for method in random.sample(METHODS, random.randint(1, 3))
+            }
+        } for _ in range(random.randint(2, 20))],
+        "x-" + random.choice(WORDS): {random.choice(WORDS): words(2)}
+    }
+
+
+def measure(client, mapping, corpus, chunk_size):
+
+    _index = Index(INDEX)
+    if _index.exists():
+        _index.delete()
+    _index.settings(**APIDoc.Index.settings)
+    _index.create()
+    _index.put_mapping(body=mapping)
+
+    errors = 0
+    _t0 = time.perf_counter()
+    for ok, _ in streaming_bulk(
+            client, ({"_index": INDEX, **doc} for doc in corpus),
+            chunk_size=chunk_size, raise_on_error=False):
+        errors += not ok
+    seconds = time.perf_counter() - _t0
+
+    _index.refresh()
+    _index.flush()
+    return seconds, errors, stats(INDEX)
+
+
+def report(name, documents, seconds, errors, _stats):
+    print(
+        f"{name:<10}"
+        f" {documents / seconds:8.1f} docs/s"
+        f" | {_stats['fields']:6} fields"
+        f" | {_stats['size'] / 1024 ** 2:8.2f} MB"
+        f" | {errors} failed")
+
+
+def main(documents=2000, chunk_size=100):
+
+    client = connections.get_connection()
+    corpus = [document() for _ in range(documents)]
+
+    try:
+        print(f"{documents} documents")
+        for name, mapping in (("dynamic", legacy(MAPPING)), ("curated", MAPPING)):
+            report(name, documents, *measure(client, mapping, corpus, chunk_size))
+
+    finally:
+        Index(INDEX).delete(ignore=404)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
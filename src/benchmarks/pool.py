@@ -0,0 +1,78 @@
+"""
+    Validation Process Pool Benchmark
+
+    Submit concurrent parse and validate jobs, like concurrent
+    requests to /api/validate, and measure how long the event
+    loop is blocked and how long each job takes to complete,
+    with the jobs in the server process and in a process pool.
+
+    cd src
+    python -m benchmarks.pool [concurrency] [processes]
+
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from controller import SmartAPI, load
+from utils.pool import ProcessPool
+
+dirname = os.path.dirname(__file__)
+
+with open(os.path.join(dirname, '../tests/mygene_full.yml'), 'rb') as file:
+    MYGENE_FULL = file.read()
+
+
+async def job(pool):
+    _t0 = time.perf_counter()
+    await pool.run(load, SmartAPI.VALIDATION_ONLY, MYGENE_FULL)
+    return time.perf_counter() - _t0
+
+
+async def ping(done, delays):
+    # a trivial request competing for the event loop
+    while not done.is_set():
+        _t0 = time.perf_counter()
+        await asyncio.sleep(0.001)
+        delays.append(time.perf_counter() - _t0 - 0.001)
+
+
+async def measure(pool, concurrency):
+
+    done, delays = asyncio.Event(), []
+    pinger = asyncio.ensure_future(ping(done, delays))
+
+    _t0 = time.perf_counter()
+    latencies = await asyncio.gather(*(job(pool) for _ in range(concurrency)))
+    total = time.perf_counter() - _t0
+
+    done.set()
+    await pinger
+
+    return total, sorted(latencies), sorted(delays) or [0]
+
+
+def report(name, total, latencies, delays):
+    print(
+        f"{name:<10} total {total * 1000:8.1f} ms"
+        f" | job p50 {statistics.median(latencies) * 1000:8.1f} ms"
+        f" p99 {latencies[int(len(latencies) * .99)] * 1000:8.1f} ms"
+        f" | loop stall max {delays[-1] * 1000:8.1f} ms")
+
+
+def main(concurrency=16, processes=os.cpu_count()):
+
+    loop = asyncio.get_event_loop()
+    for name, pool in (
+        ("inline", ProcessPool(0)),
+        ("pool", ProcessPool(processes, timeout=30))
+    ):
+        loop.run_until_complete(pool.run(load, SmartAPI.VALIDATION_ONLY, MYGENE_FULL))  # warm up
+        report(name, *loop.run_until_complete(measure(pool, concurrency)))
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
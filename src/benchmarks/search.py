@@ -0,0 +1,121 @@
+"""
+    Prefix Search Benchmark
+
+    Index a synthetic corpus of documents into a temporary index,
+    with the settings and mapping of the registry, and compare the
+    latency of prefix matching by wildcard clauses, as the query
+    builder used to, and by the edge n-gram indexed .prefix fields.
+
+    Requires a running elasticsearch, see ES_HOST in model.py.
+
+    cd src
+    python -m benchmarks.search [documents] [queries]
+
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+from elasticsearch.helpers import bulk
+from elasticsearch_dsl import Index, connections
+
+from model import APIDoc
+
+INDEX = 'smartapi_benchmark'
+
+dirname = os.path.dirname(__file__)
+
+with open(os.path.join(dirname, '../utils/mapping.json'), 'r') as file:
+    MAPPING = json.load(file)
+
+random.seed(0)
+
+# words of random lengths over a small alphabet,
+# so that prefixes are shared by many terms.
+VOCABULARY = sorted({
+    ''.join(random.choice('abcdefghijklmnop') for _ in range(random.randint(3, 12)))
+    for _ in range(20000)
+})
+
+
+def sentence(length):
+    return ' '.join(random.choice(VOCABULARY) for _ in range(length))
+
+
+def index(client, size):
+
+    _index = Index(INDEX)
+    if _index.exists():
+        _index.delete()
+    _index.settings(**APIDoc.Index.settings)
+    _index.create()
+    _index.put_mapping(body=MAPPING)
+
+    bulk(client, ({
+        "_index": INDEX,
+        "info": {
+            "title": sentence(random.randint(2, 6)),
+            "description": sentence(random.randint(20, 80))
+        }
+    } for _ in range(size)))
+
+    _index.refresh()
+
+
+def wildcard(q):
+    return {"dis_max": {"queries": [
+        {"wildcard": {"info.title": {"value": q + "*", "boost": 0.8}}},
+        {"wildcard": {"info.description": {"value": q + "*", "boost": 0.5}}},
+    ]}}
+
+
+def prefix(q):
+    return {"dis_max": {"queries": [
+        {"match": {"info.title.prefix": {"query": q, "operator": "AND", "boost": 0.8}}},
+        {"match": {"info.description.prefix": {"query": q, "operator": "AND", "boost": 0.5}}},
+    ]}}
+
+
+def measure(client, build, queries):
+
+    latencies, totals = [], []
+    for q in queries:
+        _t0 = time.perf_counter()
+        res = client.search(index=INDEX, body={"query": build(q)}, request_cache=False)
+        latencies.append(time.perf_counter() - _t0)
+        totals.append(res['hits']['total']['value'])
+
+    return sorted(latencies), totals
+
+
+def report(name, latencies, totals):
+    print(
+        f"{name:<10}"
+        f" p50 {statistics.median(latencies) * 1000:8.2f} ms"
+        f" p99 {latencies[int(len(latencies) * .99)] * 1000:8.2f} ms"
+        f" | mean hits {statistics.mean(totals):10.1f}")
+
+
+def main(documents=20000, queries=500):
+
+    client = connections.get_connection()
+    index(client, documents)
+
+    try:
+        words = [random.choice(VOCABULARY) for _ in range(queries)]
+        words = [word[:random.randint(1, 4)] for word in words]
+
+        measure(client, prefix, words[:20])  # warm up
+        print(f"{documents} documents, {queries} queries")
+        for name, build in (("wildcard", wildcard), ("prefix", prefix)):
+            report(name, *measure(client, build, words))
+
+    finally:
+        Index(INDEX).delete()
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,48 @@
+"""
+    Schema Validation Benchmark
+
+    Compare the per-validation latency of building a jsonschema
+    validator on every call against the compiled validator registry.
+
+    cd src
+    python -m benchmarks.validate [number]
+
+"""
+import os
+import sys
+import timeit
+
+import jsonschema
+
+from controller import openapis, validate, validators
+from utils import decoder
+
+dirname = os.path.dirname(__file__)
+
+with open(os.path.join(dirname, '../tests/mygene_full.yml'), 'rb') as file:
+    MYGENE_FULL = decoder.to_dict(file.read())
+
+
+def before():
+    for schema in openapis.values():
+        jsonschema.validate(MYGENE_FULL, schema)
+
+
+def after():
+    validate(MYGENE_FULL, openapis)
+
+
+def main(number=20):
+
+    validators.clear()
+    _t0 = timeit.default_timer()
+    after()  # compile
+    print(f"compile   {(timeit.default_timer() - _t0) * 1000:9.2f} ms (once)")
+
+    for name, func in (("before", before), ("after", after)):
+        seconds = timeit.timeit(func, number=number)
+        print(f"{name:<9} {seconds / number * 1000:9.2f} ms/validation")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -69,17 +69,44 @@ APP_LIST = [
     (r'/api/metadata/?', 'handlers.SmartAPIHandler', {"biothing_type": "metadata"}),
     (r'/api/metadata/(.+)/?', 'handlers.SmartAPIHandler', {"biothing_type": "metadata"}),
     (r'/api/suggestion/?', 'handlers.ValueSuggestionHandler'),
+    (r'/api/suggest/?', 'handlers.SuggestHandler'),
+    (r'/api/stats/?', 'handlers.StatsHandler'),
 ]
 
 # biothings web tester will read this
 API_VERSION = ''
 API_PREFIX = 'api'
 
+# *****************************************************************************
+# Document Validation
+# *****************************************************************************
+# parsing and validating large documents is cpu intensive, use a pool
+# of worker processes to keep the server responsive. set to 0 to run
+# in the server process. the memory limit counts the address space
+# of a worker, which initially shares that of the server process.
+VALIDATION_PROCESSES = 0
+VALIDATION_TIMEOUT = 30  # seconds
+VALIDATION_MEMORY = 2 * 1024 ** 3  # bytes
+# a batch of documents is validated concurrently,
+# limit the number of documents and of simultaneous
+# downloads, validation is limited by the pool above.
+VALIDATION_BATCH_SIZE = 1000
+VALIDATION_BATCH_DOWNLOADS = 10
+
+# *****************************************************************************
+# Notifications
+# *****************************************************************************
+# registrations are notified on the SLACK_WEBHOOKS defined in config_key.py,
+# in the background. those to a webhook within this number of seconds are
+# sent in one message, when many APIs are registered at once.
+SLACK_DIGEST = 10
+
 # *****************************************************************************
 # Biothings SDK Settings
 # *****************************************************************************
 ACCESS_CONTROL_ALLOW_METHODS = 'HEAD,GET,POST,DELETE,PUT,OPTIONS'
 ANNOTATION_DEFAULT_SCOPES = ['_id', '_meta.slug']
 ES_QUERY_BUILDER = "pipeline.SmartAPIQueryBuilder"
+ES_QUERY_BACKEND = "pipeline.SmartAPIQueryBackend"
 ES_RESULT_TRANSFORM = "pipeline.SmartAPIResultTransform"
 DISABLE_CACHING = True
@@ -35,6 +35,7 @@
 
 """
 import logging
+import os
 import string
 import sys
 from abc import ABC, abstractmethod
@@ -43,15 +44,23 @@ from collections.abc import Mapping
 from configparser import ConfigParser
 from datetime import datetime, timezone
 from enum import IntEnum
+from itertools import islice
 from urllib.parse import urlparse
 from warnings import warn
 
 import jsonschema
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
 from elasticsearch.exceptions import NotFoundError as ESNotFoundError
+from elasticsearch.helpers import BulkIndexError, streaming_bulk
+from elasticsearch_dsl.exceptions import ValidationException
 
 from model import APIDoc
 from utils import decoder, monitor
-from utils.downloader import Downloader, File, download
+from utils.blobs import FileStore, IndexStore
+from utils.cache import LRUCache
+from utils.downloader import (Downloader, File, conditional_headers, download,
+                              last_modified)
 
 if sys.version_info.major >= 3 and sys.version_info.minor >= 6:
     from hashlib import blake2b
@@ -63,21 +72,28 @@ logger = logging.getLogger(__name__)
 config = ConfigParser()
 config.read('schemas.ini')
 
-# TODO etag support
+# local copies of the schemas below,
+# the application starts from them and
+# revalidates them in the background,
+# see refresh_schemas.
+SCHEMA_CACHE = os.getenv('SCHEMA_CACHE', '.cache/schemas')
 
 # NOTE
 # Consider allowing the application to launch
 # when the core schema download fails. If that
 # happens, disable any modifications and alert
 # some slack channel to report the event.
+# This now only happens when there is no copy
+# of a schema available in the SCHEMA_CACHE.
 
-openapis = Downloader()
-openapis.download(
+openapis = Downloader(os.path.join(SCHEMA_CACHE, 'openapi'))
+swaggers = Downloader(os.path.join(SCHEMA_CACHE, 'swagger'))
+
+openapis.load(
     config['openapi'].keys(),
     config['openapi'].values()
 )
-swaggers = Downloader()
-swaggers.download(
+swaggers.load(
     config['swagger'].keys(),
     config['swagger'].values()
 )
@@ -95,6 +111,71 @@ class ConflictError(ControllerError):
     pass
 
 
+class SchemaValidators():
+    """
+        Compiled jsonschema validators.
+        One validator per schema object,
+        built on first use and then reused.
+    """
+
+    def __init__(self):
+        self._validators = {}
+
+    def get(self, schema):
+        """
+        Return the compiled validator of a schema.
+        Check the schema against its meta-schema once.
+        """
+        # keyed by identity, a schema replaced
+        # by a new object, for example after a
+        # download, compiles a new validator.
+        # the schema reference is kept so that
+        # its id cannot be reused by another.
+        entry = self._validators.get(id(schema))
+        if not entry or entry[0] is not schema:
+            cls = validator_for(schema)
+            cls.check_schema(schema)
+            entry = (schema, cls(schema))
+            self._validators[id(schema)] = entry
+        return entry[1]
+
+    def clear(self):
+        self._validators.clear()
+
+
+validators = SchemaValidators()
+
+
+def refresh_schemas():
+    """
+    Revalidate the schemas with their origins.
+    New versions are swapped in atomically.
+    Return the names of the updated schemas.
+    Not started on import, the copies loaded
+    may be outdated, run it at startup.
+    """
+    updated = openapis.refresh(
+        config['openapi'].keys(),
+        config['openapi'].values()
+    )
+    updated += swaggers.refresh(
+        config['swagger'].keys(),
+        config['swagger'].values()
+    )
+    if updated:
+        logger.info("Updated schemas: %s", updated)
+        validators.clear()  # release old versions
+    return updated
+
+
+def fingerprint():
+    """
+    Identify the versions of all schemas loaded.
+    Results computed with other versions are stale.
+    """
+    return openapis.fingerprint + swaggers.fingerprint
+
+
 def validate(doc, schemas):
     """
         Validate a document agasint schemas.
@@ -107,7 +188,12 @@ def validate(doc, schemas):
 
     try:  # validate agasint every schema
         for name, schema in schemas.items():
-            jsonschema.validate(doc, schema)
+            # same as jsonschema.validate
+            # without rebuilding the validator
+            validator = validators.get(schema)
+            error = best_match(validator.iter_errors(doc))
+            if error is not None:
+                raise error
 
     except jsonschema.ValidationError as err:
         _ = (
@@ -126,6 +212,20 @@ def validate(doc, schemas):
         raise ValueError(_) from err
 
 
+def _operations_text(pathitem):
+    # path items are indexed as keywords, see
+    # utils/mapping.json, their summaries and
+    # descriptions are also indexed as text.
+    texts = []
+    if isinstance(pathitem, Mapping):
+        for obj in (pathitem, *pathitem.values()):
+            if isinstance(obj, Mapping):
+                for key in ('summary', 'description'):
+                    if isinstance(obj.get(key), str):
+                        texts.append(obj[key])
+    return texts
+
+
 class Format(UserDict):
 
     KEYS = ()
@@ -149,7 +249,8 @@ class Format(UserDict):
             self.data['paths'] = [
                 {
                     "path": key,
-                    "pathitem": val
+                    "pathitem": val,
+                    "operations": _operations_text(val)
                 }
                 for key, val in self.data['paths'].items()
             ]
@@ -282,6 +383,30 @@ class APIRefreshStatus(AbstractEntityStatus):
         UPDATED = 299  # new version available and update successful
         INVALID = 499  # cannot update to new version because validation failed
 
+    def __init__(self, entity, status=None, timestamp=None, etag=None, date=None):
+        super().__init__(entity, status, timestamp)
+        # of the response with the current document
+        self.etag = etag
+        self.date = date  # see last_modified
+
+    @property
+    def headers(self):
+        """
+        Request headers to download the document
+        only if it has changed since it's accepted.
+        """
+        return conditional_headers(self.etag, self.date)
+
+    def unchanged(self, content):
+        """
+        Whether the content is known to be the current
+        document, without loading, decoding or comparing it.
+        """
+        if content.status == 304:  # see headers
+            return True
+        return content.status == 200 and bool(content.digest) \
+            and content.digest == self._entity._blob  # see utils.blobs
+
     def update(self, content):
 
         if not isinstance(content, File):
@@ -293,6 +418,13 @@ class APIRefreshStatus(AbstractEntityStatus):
         if content.date:  # more accurate
             self._timestamp = content.date
 
+        if self.unchanged(content):
+            self._status = self.STATUS.NOT_MODIFIED.value
+            if content.status == 200:
+                self.etag = content.etag
+                self.date = last_modified(content)
+            return
+
         if content.status != 200 or not content.raw:
             return  # no need to update _raw
 
@@ -308,6 +440,8 @@ class APIRefreshStatus(AbstractEntityStatus):
             else:  # raw field changed
                 self._status = self.STATUS.UPDATED.value
             self._entity.raw = content.raw
+            self.etag = content.etag
+            self.date = last_modified(content)
 
 
 class Slug():
@@ -344,6 +478,121 @@ class Slug():
             raise ValueError("Slug contains invalid characters.")
 
 
+class KeyResolver():
+    """
+        Resolve the secondary keys, slug and url, to _id.
+        Found _ids are cached until the next write in this
+        process or they expire, for writes in other ones.
+    """
+    # Misses are not cached, and uniqueness checks
+    # skip the cache. A stale hit can be the _id of
+    # the document saved, which gave up the value in
+    # another process since, and a stale miss is a
+    # value claimed since, both allow a duplicate.
+
+    def __init__(self, ttl=60):
+        self._cache = LRUCache(maxsize=4096, ttl=ttl)
+
+    def resolve(self, value, field='slug', cached=True):
+        _id = self._cache.get((field, value)) if cached else None
+        if _id is None:
+            _id = APIDoc.resolve(value, '_meta.' + field)
+            if _id:
+                self._cache.set((field, value), _id)
+        return _id
+
+    async def resolve_async(self, client, value, field='slug', cached=True):
+        _id = self._cache.get((field, value)) if cached else None
+        if _id is None:
+            _id = await APIDoc.resolve_async(client, value, '_meta.' + field)
+            if _id:
+                self._cache.set((field, value), _id)
+        return _id
+
+    def resolve_many(self, values, field='slug'):
+        result, missing = {}, []
+        for value in values:
+            result[value] = self._cache.get((field, value))
+            if result[value] is None:
+                missing.append(value)
+        for value, _id in APIDoc.resolve_many(missing, '_meta.' + field).items():
+            result[value] = _id
+            if _id:
+                self._cache.set((field, value), _id)
+        return result
+
+    def invalidate(self):
+        self._cache.clear()
+
+
+resolver = KeyResolver()
+
+# the raw documents are stored out of the search
+# index, in a side index, or in a local directory
+# if specified, see utils.blobs.
+RAW_STORE = os.getenv('RAW_STORE')
+
+blobs = FileStore(RAW_STORE) if RAW_STORE else IndexStore()
+
+# zstd dictionaries the raw documents are compressed
+# with, kept in the same store, read on first use,
+# see admin.recompress.
+decoder.compression.load(blobs)
+
+
+class Writes():
+    """
+        Count the database writes in this process.
+        Results derived from the database record the
+        generation they are computed at, and become
+        stale when a write happens after that.
+    """
+
+    def __init__(self):
+        self.generation = 0
+
+    def record(self):
+        self.generation += 1
+        resolver.invalidate()
+
+
+writes = Writes()
+
+
+class Aggregations():
+    """
+        Cached terms aggregations for UI suggestions.
+        Computed once per write generation in this process,
+        and refreshed after ttl for writes in other processes.
+    """
+
+    # used on every registry page
+    FIELDS = ('tags.name', 'info.contact.name')
+
+    def __init__(self, ttl=300):
+        self._cache = LRUCache(maxsize=256, ttl=ttl)
+
+    async def get(self, client, field, size=25):
+        generation = writes.generation
+        entry = self._cache.get((field, size))
+        if entry and entry[0] == generation:
+            return entry[1]
+        result = await APIDoc.aggregate_async(client, field, size)
+        self._cache.set((field, size), (generation, result))
+        return result
+
+    async def precompute(self, client):
+        for field in self.FIELDS:
+            self._cache.pop((field, 25))
+            try:
+                await self.get(client, field)
+            except Exception as exc:  # background
+                logger.warning("Cannot aggregate %s: %s", field, exc)
+
+
+aggregations = Aggregations()
+
+
 class SmartAPI(AbstractWebEntity, Mapping):
 
     # SmartAPI.slug.validate(value: Union[str, NoneType]) -> None
@@ -367,7 +616,67 @@ class SmartAPI(AbstractWebEntity, Mapping):
         self.last_updated = None
 
         self._raw = None
-        self._data = {}
+        self._dict = {}
+
+        # key of the raw field in the blob store,
+        # set when loaded from or saved to the db.
+        self._blob = None
+
+        # set when loaded without the raw field,
+        # which is fetched on first access.
+        self._deferred = False
+
+        # whether the document is in the database
+        # and whether its content changed since, if
+        # not, only _meta and _status need updates.
+        self._persisted = False
+        self._modified = True
+
+    def _fetch(self):
+        """
+        Load the raw field deferred by a get.
+        """
+        if self._deferred:
+            try:
+                if self._blob:
+                    raw = blobs.get(self._blob)
+                else:  # saved before the blob store
+                    doc = APIDoc.get(self._id, _source_includes=['_raw'])
+                    raw = decoder.decompress(doc._raw)
+            except (KeyError, ESNotFoundError) as err:
+                raise NotFoundError from err
+            self._undefer(raw)
+
+    async def fetch_async(self, client):
+        """
+        Load the raw field deferred by a get, using an
+        async elasticsearch client. Do this before passing
+        the object to code that may access its content.
+        """
+        if self._deferred:
+            try:
+                if self._blob:
+                    raw = await blobs.get_async(client, self._blob)
+                else:  # saved before the blob store
+                    doc = await APIDoc.get_async(
+                        client, self._id, _source_includes=['_raw'])
+                    raw = decoder.decompress(doc._raw)
+            except (KeyError, ESNotFoundError) as err:
+                raise NotFoundError from err
+            self._undefer(raw)
+
+    def _undefer(self, raw):
+        self._raw = raw
+        self._dict = None  # parse on access
+        self._deferred = False
+
+    @property
+    def _data(self):
+        # documents loaded from the database are
+        # only parsed when their content is used.
+        if self._dict is None:
+            self._dict = decoder.to_dict(self.raw) if self.raw else {}
+        return self._dict
 
     @property
     def raw(self):
@@ -375,6 +684,7 @@ class SmartAPI(AbstractWebEntity, Mapping):
         Bytes that correspond to the URL.
         This object is a view of this field.
         """
+        self._fetch()
         return self._raw
 
     @raw.setter
@@ -383,11 +693,15 @@ class SmartAPI(AbstractWebEntity, Mapping):
         if not value:
             raise ControllerError("Empty value.")
         try:
-            self._data = decoder.to_dict(value)
+            self._dict = decoder.to_dict(value)
         except (ValueError, TypeError) as err:
             raise ControllerError(str(err)) from err
         else:  # dict conversion success
+            if self._deferred or value != self._raw:
+                self._modified = True
+                self._blob = None
             self._raw = value
+            self._deferred = False
 
         # update the timestamps
         self.last_updated = datetime.now(timezone.utc)
@@ -418,29 +732,100 @@ class SmartAPI(AbstractWebEntity, Mapping):
         return bool(APIDoc.exists(_id))
 
     @classmethod
-    def find(cls, val, field='slug'):
+    async def exists_async(cls, client, _id):
+        """
+        Same as exists, using an async elasticsearch client.
+        """
+        return bool(await APIDoc.exists_async(client, _id))
+
+    @classmethod
+    def find(cls, val, field='slug', cached=True):
         """
         Find a SmartAPI by a field other than _id.
         Return the first _id or None if no match.
+        Slugs and urls found recently are cached,
+        unless cached is False, see KeyResolver.
         """
         # Data can change in between calls.
         # Use try-catch blocks in follow up ops.
 
-        if field in ('slug', 'username', 'url'):
+        if field in ('slug', 'url'):
+            return resolver.resolve(val, field, cached)
+
+        if field == 'username':
             field = '_meta.' + field
 
         return APIDoc.exists(val, field)
 
     @classmethod
-    def get(cls, _id):
+    async def find_async(cls, client, val, field='slug', cached=True):
+        """
+        Same as find, using an async elasticsearch client.
+        """
+        if field in ('slug', 'url'):
+            return await resolver.resolve_async(client, val, field, cached)
+
+        if field == 'username':
+            field = '_meta.' + field
+
+        return await APIDoc.exists_async(client, val, field)
+
+    @classmethod
+    def find_many(cls, vals, field='slug'):
+        """
+        Find SmartAPIs by their slugs or urls.
+        Return a dict of value and _id or None.
+        """
+        assert field in ('slug', 'url')
+        return resolver.resolve_many(vals, field)
 
+    @classmethod
+    def get(cls, _id, meta_only=False):
+        """
+        Load a SmartAPI from the database.
+        The raw field is loaded on first access,
+        from the blob store. With meta_only, the
+        same happens to those saved inline before.
+        """
         try:
-            doc = APIDoc.get(_id)
+            doc = APIDoc.get(_id, _source_includes=cls._fields(meta_only))
         except ESNotFoundError as err:
             raise NotFoundError from err
 
+        return cls._from_doc(doc)
+
+    @classmethod
+    async def get_async(cls, client, _id, meta_only=False):
+        """
+        Same as get, using an async elasticsearch client.
+        """
+        try:
+            doc = await APIDoc.get_async(
+                client, _id, _source_includes=cls._fields(meta_only))
+        except ESNotFoundError as err:
+            raise NotFoundError from err
+
+        return cls._from_doc(doc)
+
+    @staticmethod
+    def _fields(meta_only=False):
+        # the document content is
+        # indexed for search only
+        if meta_only:
+            return ['_meta', '_status', '_blob']
+        return ['_meta', '_status', '_blob', '_raw']
+
+    @classmethod
+    def _from_doc(cls, doc):
+
         obj = cls(doc._meta.url)
-        obj.raw = decoder.decompress(doc._raw)
+        obj._blob = doc._blob
+
+        if doc._raw:  # saved before the blob store
+            obj._raw = decoder.decompress(doc._raw)
+            obj._dict = None  # parsed on access
+        else:  # loaded on access
+            obj._deferred = True
 
         obj.username = doc._meta.username
         obj.slug = doc._meta.slug
@@ -455,9 +840,14 @@ class SmartAPI(AbstractWebEntity, Mapping):
 
         obj.webdoc = APIRefreshStatus(
             obj, doc._status.refresh_status,
-            doc._status.refresh_ts
+            doc._status.refresh_ts,
+            doc._status.refresh_etag,
+            doc._status.refresh_date
         )
 
+        obj._persisted = True
+        obj._modified = False
+
         return obj
 
     def _validate_dispatch(self):
@@ -501,15 +891,18 @@ class SmartAPI(AbstractWebEntity, Mapping):
     def refresh(self, file=None):
 
         if file is None:  # blocking network operation
-            file = download(self.url, raise_error=False)
+            file = download(self.url, raise_error=False, headers=self.webdoc.headers)
 
         self.webdoc.update(file)
         return self.webdoc.status
 
-    def save(self):
-        # TODO DOCSTRING
+    def _check(self):
+        """
+        Check the properties before saving.
+        Slug uniqueness is left to the callers to check.
+        """
 
-        if not self.raw:
+        if not (self._raw or self._deferred):
             raise ControllerError("No content.")
 
         if not self.username:
@@ -532,6 +925,14 @@ class SmartAPI(AbstractWebEntity, Mapping):
         if self.date_created > self.last_updated:
             raise ControllerError("Invalid timestamps.")
 
+    def _to_doc(self):
+        """
+        Check the properties and build the database document.
+        Slug uniqueness is left to the callers to check.
+        """
+
+        self._check()
+
         # NOTE
         # why not enforce validation here?
         # we add additional constraints to the application from time to time
@@ -541,16 +942,6 @@ class SmartAPI(AbstractWebEntity, Mapping):
         _doc = self._validate_dispatch()
         _doc.transform()
 
-        if self.slug:
-            _id = self.find(self.slug)
-            if _id and _id != self._id:  # another doc same slug.
-                raise ConflictError("Slug is already registered.")
-
-        # NOTE
-        # if the slug of another document changed at this point
-        # it's possible to have two documents with the same slug
-        # registered. but it should be rare enough in reality.
-
         doc = APIDoc(**_doc)
         doc.meta.id = self._id
 
@@ -566,29 +957,253 @@ class SmartAPI(AbstractWebEntity, Mapping):
 
         doc._status.refresh_status = self.webdoc.status
         doc._status.refresh_ts = self.webdoc.timestamp
+        doc._status.refresh_etag = self.webdoc.etag
+        doc._status.refresh_date = self.webdoc.date
+
+        # saved by the callers before the document
+        doc._blob = blobs.key(self.raw)
+        doc._raw = None
+
+        return doc
+
+    def _to_fields(self):
+        """
+        Check the properties and build the _meta and
+        _status fields for a partial document update.
+        """
+
+        self._check()
+
+        return {
+            "_meta": {
+                "url": str(self.url),
+                "username": self.username,
+                "slug": self.slug,
+                "date_created": self.date_created,
+                "last_updated": self.last_updated
+            },
+            "_status": {
+                "uptime_status": self.uptime.status,
+                "uptime_ts": self.uptime.timestamp,
+                "refresh_status": self.webdoc.status,
+                "refresh_ts": self.webdoc.timestamp,
+                "refresh_etag": self.webdoc.etag,
+                "refresh_date": self.webdoc.date
+            }
+        }
+
+    def _partial(self, reindex):
+        # only the metadata needs to be written
+        return self._persisted and not self._modified and not reindex
+
+    def save(self, reindex=False):
+        """
+        Save this SmartAPI to the database.
+        If it was loaded from the database and its content
+        hasn't changed, only _meta and _status are updated,
+        unless reindex is set, for example after mapping changes.
+        Raise ControllerError if it cannot be saved.
+        Raise ConflictError if the slug is registered.
+        """
+
+        if self._partial(reindex):
+            doc = self._to_fields()
+        else:  # the whole document
+            doc = self._to_doc()
+
+        if self.slug:
+            _id = self.find(self.slug, cached=False)
+            if _id and _id != self._id:  # another doc same slug.
+                raise ConflictError("Slug is already registered.")
+
+        # NOTE
+        # if the slug of another document changed at this point
+        # it's possible to have two documents with the same slug
+        # registered. but it should be rare enough in reality.
+
+        try:
+            if isinstance(doc, APIDoc):
+                blobs.put(self.raw, replace=reindex)
+                doc.save(skip_empty=False)
+                self._blob = doc._blob
+            else:  # partial update
+                APIDoc.patch(self._id, doc)
+        except ESNotFoundError as err:
+            raise NotFoundError from err
+        finally:
+            writes.record()
+
+        self._persisted = True
+        self._modified = False
+
+        return self._id
 
-        doc._raw = decoder.compress(self.raw)
-        doc.save(skip_empty=False)
+    async def save_async(self, client, reindex=False):
+        """
+        Same as save, using an async elasticsearch client.
+        """
+
+        if self._partial(reindex):
+            doc = self._to_fields()
+        else:  # the whole document
+            await self.fetch_async(client)
+            doc = self._to_doc()
+
+        if self.slug:
+            _id = await self.find_async(client, self.slug, cached=False)
+            if _id and _id != self._id:  # another doc same slug.
+                raise ConflictError("Slug is already registered.")
+
+        try:
+            if isinstance(doc, APIDoc):
+                await blobs.put_async(client, self.raw, replace=reindex)
+                await doc.save_async(client)
+                self._blob = doc._blob
+            else:  # partial update
+                await APIDoc.patch_async(client, self._id, doc)
+        except ESNotFoundError as err:
+            raise NotFoundError from err
+        finally:
+            writes.record()
+
+        self._persisted = True
+        self._modified = False
 
         return self._id
 
     @classmethod
-    def get_all(cls, size=10, from_=0):
+    def save_many(cls, smartapis, chunk_size=100, reindex=False):
         """
-        Returns a list of SmartAPIs.
-        Size is the at-most number.
+        Save SmartAPIs to the database in bulk requests.
+        Unchanged content is not reindexed, same as save.
+        Return a list of (_id, error) of every SmartAPI,
+        where error is None if it is saved successfully,
+        or the ControllerError that prevented saving it.
         """
-        search = APIDoc.search()
-        search = search.source(False)
-        search = search[from_: from_ + size]
 
-        for hit in search:
-            try:  # unlikely but possible
-                doc = cls.get(hit.meta.id)
-            except ESNotFoundError:
-                pass  # inconsistent
-            else:  # consistent
-                yield doc
+        results = []
+        claimed = {}  # slug: _id, in this call
+        client = APIDoc._get_connection()
+
+        smartapis = iter(smartapis)
+        chunk = list(islice(smartapis, chunk_size))
+
+        while chunk:
+
+            docs = []
+            for smartapi in chunk:
+                try:
+                    if smartapi._partial(reindex):
+                        doc = {
+                            "_op_type": "update",
+                            "_index": APIDoc.Index.name,
+                            "_id": smartapi._id,
+                            "doc": smartapi._to_fields()
+                        }
+                    else:  # the whole document
+                        doc = smartapi._to_doc()
+                        doc.full_clean()
+                        doc = doc.to_dict(include_meta=True, skip_empty=False)
+                except (ControllerError, ValidationException) as err:
+                    results.append((smartapi._id, err))
+                else:
+                    docs.append((smartapi, doc))
+
+            # check slug conflicts in one request,
+            # those of earlier chunks may not be
+            # searchable yet, so they are tracked.
+            slugs = {smartapi.slug for smartapi, _ in docs if smartapi.slug}
+            if slugs:
+                search = APIDoc.search()
+                search = search.filter('terms', _meta__slug=list(slugs))
+                search = search.source(['_meta.slug'])
+                for hit in search[:len(slugs) * 2]:
+                    claimed.setdefault(hit._meta.slug, hit.meta.id)
+
+            pending, saved, raws, keys = [], {}, [], {}
+            for smartapi, doc in docs:
+                _id, slug = smartapi._id, smartapi.slug
+                if slug and claimed.setdefault(slug, _id) != _id:
+                    error = ConflictError("Slug is already registered.")
+                    results.append((_id, error))
+                else:
+                    pending.append((_id, doc))
+                    saved[_id] = smartapi
+                    if '_source' in doc:  # the whole document
+                        keys[_id] = doc['_source']['_blob']
+                        raws.append(smartapi.raw)
+
+            errors = {}  # blob key: why it's not stored
+            try:  # before the documents referring to them
+                blobs.put_many(raws, replace=reindex)
+            except BulkIndexError as exc:  # some of them
+                for error in exc.errors:
+                    item = next(iter(error.values()))
+                    errors[item['_id']] = str(item.get('error'))
+            except Exception as exc:  # pylint: disable=broad-except
+                errors = dict.fromkeys(keys.values(), str(exc))
+
+            # only the documents referring to blobs
+            # not stored fail, partial updates don't.
+            actions = []
+            for _id, doc in pending:
+                if keys.get(_id) in errors:
+                    results.append((_id, ControllerError(errors[keys[_id]])))
+                else:
+                    actions.append(doc)
+
+            for success, item in streaming_bulk(
+                    client, actions, chunk_size=chunk_size,
+                    raise_on_error=False, raise_on_exception=False):
+                _, item = item.popitem()  # index or update
+                if success:
+                    smartapi = saved[item['_id']]
+                    smartapi._persisted = True
+                    smartapi._modified = False
+                    smartapi._blob = keys.get(item['_id'], smartapi._blob)
+                    results.append((item['_id'], None))
+                else:  # reported per item by elasticsearch
+                    error = ControllerError(str(item.get('error')))
+                    results.append((item['_id'], error))
+
+            chunk = list(islice(smartapis, chunk_size))
+
+        writes.record()
+        return results
+
+    @classmethod
+    def get_all(cls, size=None, from_=0, batch=100):
+        """
+        Returns an iterator of SmartAPIs.
+        Size is the at-most number, None for all.
+        Documents are retrieved in batches, with one
+        request per batch, and only one batch is held
+        in memory at a time when iterating over all.
+        Their raw fields are loaded from the blob store
+        with one request per batch, not on access.
+        """
+        search = APIDoc.search().source(cls._fields())
+
+        if size is None:  # scroll through
+            # callers may take a while to process
+            # a batch, like checking every api's
+            # uptime, keep the scroll alive longer.
+            hits = search.params(size=batch, scroll='30m').scan()
+            hits = islice(hits, from_, None)
+        else:  # a single page
+            hits = search[from_: from_ + size]
+
+        hits = iter(hits)
+        while True:
+            docs = list(islice(hits, batch))
+            if not docs:
+                break
+            raws = blobs.get_many({doc._blob for doc in docs if doc._blob})
+            for doc in docs:
+                obj = cls._from_doc(doc)
+                if obj._deferred and obj._blob in raws:
+                    obj._undefer(raws[obj._blob])
+                yield obj
 
     @staticmethod
     def get_tags(field='info.contact.name'):
@@ -606,15 +1221,62 @@ class SmartAPI(AbstractWebEntity, Mapping):
         """
         return APIDoc.aggregate(field)
 
+    @staticmethod
+    async def suggest_async(client, prefix, size=10):
+        """
+        Autocomplete a prefix with the titles, slugs,
+        tags and contact names of the registered APIs.
+
+        Result looks like:
+        [
+            {
+                "field": "info.title",
+                "text": "MyGene.info API",
+                "_id": "59dce17363dce279d389100834e43648"
+            },
+            ...
+        ]
+        """
+        return await APIDoc.suggest_async(client, prefix, size)
+
     def delete(self):
 
+        try:  # without retrieving the document
+            APIDoc(meta={'id': self._id}).delete()
+        except ESNotFoundError as err:
+            raise NotFoundError() from err
+        finally:
+            writes.record()
+
+        return self._id
+
+    async def delete_async(self, client):
+        """
+        Same as delete, using an async elasticsearch client.
+        """
         try:
-            APIDoc.get(self._id).delete()
+            await APIDoc.delete_async(client, self._id)
         except ESNotFoundError as err:
             raise NotFoundError() from err
+        finally:
+            writes.record()
 
         return self._id
 
+    def __getstate__(self):
+        # deferred raw fields stay deferred, no database
+        # access here, callers that pass objects to code
+        # needing their content use fetch_async before.
+        return self.__dict__
+
+    def __setstate__(self, state):
+        # restore the identity of the placeholder
+        # after passing the object between processes
+        if isinstance(state.get('_url'), PlaceHolder):
+            if state['_url'] == self.VALIDATION_ONLY:
+                state['_url'] = self.VALIDATION_ONLY
+        self.__dict__.update(state)
+
     # READ-ONLY DICT-LIKE ACCESS
     # FOR FIRST LEVEL KEYS
 
@@ -626,3 +1288,41 @@ class SmartAPI(AbstractWebEntity, Mapping):
 
     def __len__(self):
         return len(self._data)
+
+
+# JOBS
+# Module-level functions that can be sent
+# to a worker process, see utils.pool.
+
+
+def load(url, raw):
+    """
+    Create a SmartAPI of raw bytes and validate it.
+    Raise ControllerError if it is not valid.
+    """
+    smartapi = SmartAPI(url)
+    smartapi.raw = raw
+    smartapi.validate()
+    return smartapi
+
+
+def check(raw):
+    """
+    Validate raw bytes as a SmartAPI document. Return
+    its version and None, or None and the error that
+    makes it invalid, small to send back from the pool.
+    """
+    try:
+        smartapi = load(SmartAPI.VALIDATION_ONLY, raw)
+    except (ControllerError, AssertionError) as err:
+        return None, str(err)
+    return smartapi.version, None
+
+
+def refresh(smartapi, file):
+    """
+    Refresh a SmartAPI with a downloaded file.
+    Return the SmartAPI refreshed.
+    """
+    smartapi.refresh(file)
+    return smartapi
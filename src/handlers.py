@@ -1,21 +1,29 @@
 
+import asyncio
 import json
 import logging
 from collections import OrderedDict
+from hashlib import blake2b
 
 import certifi
 import tornado.gen
 import torngithub
 from biothings.web.handlers import BaseAPIHandler, BiothingHandler
 from biothings.web.handlers.exceptions import BadRequest, EndRequest
-from tornado.httpclient import AsyncHTTPClient
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
 from tornado.httputil import url_concat
 from tornado.web import Finish, HTTPError
 from torngithub import json_encode
 
-from controller import ControllerError, NotFoundError, SmartAPI
+from controller import (ControllerError, NotFoundError, SmartAPI, aggregations,
+                        check, fingerprint, load, refresh, writes)
+from pipeline import documents
+from utils.cache import LRUCache, SingleFlight
 from utils.downloader import DownloadError, download_async
-from utils.notification import SlackNewAPIMessage, SlackNewTranslatorAPIMessage
+from utils.pool import PoolError, ProcessPool
+from utils.notification import (Dispatcher, SlackNewAPIMessage,
+                                SlackNewTranslatorAPIMessage, post_json)
+from utils.sessions import session
 
 
 def github_authenticated(func):
@@ -50,19 +58,88 @@ class BaseHandler(BaseAPIHandler):
         if 'Authorization' in self.request.headers:
             if self.request.headers['Authorization'].startswith('Bearer '):
                 token = self.request.headers['Authorization'].split(' ', 1)[1]
-                http_client = AsyncHTTPClient()
-                try:
-                    response = await http_client.fetch(
-                        "https://api.github.com/user", request_timeout=10,
-                        headers={'Authorization': 'token ' + token}, ca_certs=certifi.where())
-                    user = json.loads(response.body)
-                except Exception as e:  # TODO
-                    logging.warning(e)
-                else:
-                    if 'login' in user:
-                        logging.info('logged in user from github token: %s', user)
-                        self.set_secure_cookie("user", json_encode(user))
-                        self.current_user = user
+                user = await self.github_user(token)
+                if user:
+                    self.set_secure_cookie("user", json_encode(user))
+                    self.current_user = user
+
+    # github users of bearer tokens, keyed by token hashes,
+    # None for rejected tokens, so that clients sending the
+    # same token don't wait for github every request.
+    tokens = LRUCache(maxsize=1024, ttl=300)
+    tokens_rejected_ttl = 60
+    _token_lookups = SingleFlight()
+
+    async def github_user(self, token):
+        """
+        Return the github user of a token or None.
+        Concurrent requests with a token share a lookup.
+        """
+        key = blake2b(token.encode()).hexdigest()
+        user = self.tokens.get(key, False)
+        if user is False:
+            user = await self._token_lookups.run(key, self._github_user, key, token)
+        return user
+
+    async def _github_user(self, key, token):
+        http_client = AsyncHTTPClient()
+        try:
+            response = await http_client.fetch(
+                "https://api.github.com/user", request_timeout=10,
+                headers={'Authorization': 'token ' + token}, ca_certs=certifi.where())
+            user = json.loads(response.body)
+        except HTTPClientError as e:
+            logging.warning(e)
+            if e.code == 401:  # bad credentials
+                self.tokens.set(key, None, self.tokens_rejected_ttl)
+            return None
+        except Exception as e:  # TODO
+            logging.warning(e)
+            return None  # not cached, could be transient
+        if 'login' not in user:
+            self.tokens.set(key, None, self.tokens_rejected_ttl)
+            return None
+        logging.info('logged in user from github token: %s', user)
+        self.tokens.set(key, user)
+        return user
+
+    # shared by all handlers, see config.py
+    _pool = None
+
+    @property
+    def pool(self):
+        """
+        Process pool to parse and validate documents.
+        Workers validate with the schemas they're forked
+        with, they're replaced when those are refreshed.
+        """
+        if BaseHandler._pool is None:
+            BaseHandler._pool = ProcessPool(
+                getattr(self.web_settings, 'VALIDATION_PROCESSES', 0),
+                getattr(self.web_settings, 'VALIDATION_TIMEOUT', None),
+                getattr(self.web_settings, 'VALIDATION_MEMORY', None),
+                state=fingerprint)
+        return BaseHandler._pool
+
+    _notifications = None
+
+    @property
+    def notifications(self):
+        """
+        Background delivery of slack notifications.
+        """
+        if BaseHandler._notifications is None:
+            BaseHandler._notifications = Dispatcher(
+                post_json, digest=getattr(self.web_settings, 'SLACK_DIGEST', 0))
+        return BaseHandler._notifications
+
+    @property
+    def es_client(self):
+        """
+        Async elasticsearch client with a connection
+        pool shared by the application, see biothings.
+        """
+        return self.web_settings.connections.async_client
 
     def get_current_user(self):
         user_json = self.get_secure_cookie("user")
@@ -148,6 +225,17 @@ class ValidateHandler(BaseHandler):
         "openapi": "3.0.0",
         ...
     }
+
+    Validate a batch of URLs and documents, and
+    stream the results as they complete, one JSON
+    object per line, with the index of the item.
+
+    POST /api/validate
+    [
+        "<url>",
+        {"openapi": "3.0.0", ...},
+        ...
+    ]
     """
 
     name = "validator"
@@ -172,16 +260,20 @@ class ValidateHandler(BaseHandler):
             raise BadRequest(details="GET takes no request body.")
 
         raw = await self.download(self.args.url)
-        self.validate(raw)
+        await self.validate(raw)
 
     async def post(self):
 
+        if isinstance(self.args_json, list):
+            await self.validate_batch(self.args_json)
+            return
+
         if self.args.url:
             raw = await self.download(self.args.url)
         else:  # then treat the request body as raw
             raw = self.request.body
 
-        self.validate(raw)
+        await self.validate(raw)
 
     async def download(self, url):
 
@@ -192,24 +284,166 @@ class ValidateHandler(BaseHandler):
         else:  # other file info irrelevent for validation
             return file.raw
 
-    def validate(self, raw):
+    # verdicts of recently validated documents
+    # keyed by content hash and schema versions
+    # shared by all requests and url downloads.
+    verdicts = LRUCache(maxsize=1024, ttl=3600)
 
+    async def verdict(self, raw):
+        """
+        Return whether the document is valid and the details.
+        Raise PoolError, not cached, when it cannot be decided.
+        """
+        if isinstance(raw, str):
+            raw = raw.encode()
+
+        key = (blake2b(raw or b'').hexdigest(), fingerprint())
+        verdict = self.verdicts.get(key)
+
+        if verdict is None:
+            version, error = await self.pool.run(check, raw)
+            if error is None:
+                verdict = (True, f'valid SmartAPI ({version}) metadata.')
+            else:
+                verdict = (False, error)
+
+            self.verdicts.set(key, verdict)
+
+        return verdict
+
+    async def validate(self, raw):
+
+        try:
+            success, details = await self.verdict(raw)
+        except PoolError as err:  # could pass next time
+            raise HTTPError(503, reason=str(err)) from err
+        if not success:
+            raise BadRequest(details=details)
+
+        self.finish({
+            'success': True,
+            'details': details
+        })
+
+    async def validate_item(self, index, item, downloads):
+        """
+        Validate an item of a batch. Its failures of
+        any kind are reported in its result, so that
+        the other items are still validated.
+        """
+        result = {'index': index}
         try:
-            smartapi = SmartAPI(SmartAPI.VALIDATION_ONLY)
-            smartapi.raw = raw
-            smartapi.validate()
+            success, details = await self._validate_item(result, item, downloads)
+        except (DownloadError, ValueError, PoolError) as err:
+            success, details = False, str(err)
+        except Exception as err:  # pylint: disable=broad-except
+            logging.exception("Batch validation of item %s failed.", index)
+            success, details = False, f"Internal error: {type(err).__name__}."
+        result.update(success=success, details=details)
+        return result
+
+    async def _validate_item(self, result, item, downloads):
+
+        if isinstance(item, str):  # url
+            result['url'] = item
+            async with downloads:
+                file = await download_async(item)
+            raw = file.raw
+
+        elif isinstance(item, dict):  # document
+            raw = json.dumps(item).encode()
 
-        except (ControllerError, AssertionError) as err:
-            raise BadRequest(details=str(err))
         else:
-            self.finish({
-                'success': True,
-                'details': f'valid SmartAPI ({smartapi.version}) metadata.'
-            })
+            return False, "Expect a URL or a document."
+
+        return await self.verdict(raw)
+
+    async def validate_batch(self, items):
+
+        size = getattr(self.web_settings, 'VALIDATION_BATCH_SIZE', 1000)
+        if not items:
+            raise BadRequest(details="Empty batch.")
+        if len(items) > size:
+            raise BadRequest(details=f"Batch size exceeds {size}.")
+
+        downloads = asyncio.Semaphore(
+            getattr(self.web_settings, 'VALIDATION_BATCH_DOWNLOADS', 10))
+        tasks = [
+            asyncio.ensure_future(self.validate_item(index, item, downloads))
+            for index, item in enumerate(items)
+        ]
+
+        self.set_header('Content-Type', 'application/x-ndjson')
+        try:
+            for task in asyncio.as_completed(tasks):
+                self.write(json.dumps(await task) + '\n')
+                await self.flush()
+        finally:  # the client may have disconnected
+            for task in tasks:
+                task.cancel()
+
+        self.finish()
 
 
 class SmartAPIReadOnlyHandler(BiothingHandler):
 
+    # serialized responses of single documents, valid
+    # until the next write in this process or they expire,
+    # for writes in other ones. see compute_etag.
+    responses = LRUCache(maxsize=1024, ttl=60, maxbytes=64 * 1024 ** 2)
+
+    def initialize(self, biothing_type=None):
+        super().initialize(biothing_type)
+        self._generation = writes.generation
+        self._response = None  # (generation, etag, type, body)
+        self._version = None  # (_id, _version)
+
+    def _response_key(self):
+        if self.request.method != 'GET' or not self.args.id:
+            return None  # only cache single documents
+        return (
+            self.args.id, self.format,
+            tuple(self.args.esqb._source or ()),
+            tuple(sorted((k, str(v)) for k, v in self.args.transform.items()))
+        )
+
+    async def get(self, *args, **kwargs):
+
+        key = self._response_key()
+        response = self.responses.get(key) if key else None
+
+        if response and response[0] == self._generation:
+            self._response = response
+            self.set_header("Content-Type", response[2])
+            self.finish(response[3])  # 304 if etag matches
+        else:  # query elasticsearch
+            await super().get(*args, **kwargs)
+
+    def compute_etag(self):
+        """
+        Derive strong etags of single documents from their
+        _id and _version, which change on every write, and
+        cache the serialized response for later requests.
+        """
+        if self._response:
+            return self._response[1]
+
+        key = self._response_key()
+        if not key or not self._version:
+            return super().compute_etag()
+
+        hasher = blake2b(digest_size=16)
+        hasher.update(repr((key, self._version)).encode())
+        etag = '"%s"' % hasher.hexdigest()
+
+        body = b"".join(self._write_buffer)
+        self.responses.set(key, (
+            self._generation, etag,
+            self._headers.get("Content-Type"), body
+        ), size=len(body))
+
+        return etag
+
     def pre_query_builder_hook(self, options):
         options = super().pre_query_builder_hook(options)
 
@@ -226,6 +460,12 @@ class SmartAPIReadOnlyHandler(BiothingHandler):
 
     def pre_transform_hook(self, options, res):
 
+        # identify the version of a single document
+        if options.esqb.q != '__all__' and isinstance(res, dict):
+            hits = res.get('hits', {}).get('hits', [])
+            if len(hits) == 1 and '_version' in hits[0]:
+                self._version = (hits[0]['_id'], hits[0]['_version'])
+
         # raw == 1 is reserved for adding underscore fields
         if options.control.raw == 2:
             raise Finish(res)
@@ -279,7 +519,7 @@ class SmartAPIHandler(BaseHandler, SmartAPIReadOnlyHandler):
         Add an API document
         """
 
-        if SmartAPI.find(self.args.url, "url"):
+        if await SmartAPI.find_async(self.es_client, self.args.url, "url"):
             raise HTTPError(409)
 
         try:
@@ -288,11 +528,11 @@ class SmartAPIHandler(BaseHandler, SmartAPIReadOnlyHandler):
             raise BadRequest(details=str(err)) from err
 
         try:
-            smartapi = SmartAPI(self.args.url)
-            smartapi.raw = file.raw
-            smartapi.validate()
+            smartapi = await self.pool.run(load, self.args.url, file.raw)
         except (ControllerError, AssertionError) as err:
             raise BadRequest(details=str(err)) from err
+        except PoolError as err:  # could pass next time
+            raise HTTPError(503, reason=str(err)) from err
 
         if self.args.dryrun:
             raise Finish({
@@ -302,62 +542,50 @@ class SmartAPIHandler(BaseHandler, SmartAPIReadOnlyHandler):
 
         try:
             smartapi.username = self.current_user['login']
-            smartapi.refresh(file)  # populate webdoc meta
-            _id = smartapi.save()
+            # populate webdoc meta, off the event loop
+            smartapi = await self.pool.run(refresh, smartapi, file)
+            _id = await smartapi.save_async(self.es_client)
         except ControllerError as err:
             raise BadRequest(details=str(err)) from err
+        except PoolError as err:
+            raise HTTPError(503, reason=str(err)) from err
         else:
             self.finish({
                 'success': True,
                 '_id': _id
             })
-            await self._notify(smartapi)
+            self._notify(smartapi)
 
-    async def _notify(self, smartapi):
+    def _notify(self, smartapi):
 
         if self.settings.get('debug'):
             return
 
-        client = AsyncHTTPClient()
         kwargs = {
             "_id": smartapi._id,
             "name": dict(smartapi).get('info', {}).get('title', '<Notitle>'),
             "description": dict(smartapi).get('info', {}).get('description', '')[:120] + '...',
             "username": smartapi.username
         }
-        try:
-            # NOTE
-            # SLACK_WEBHOOKS = [
-            #     {"webhook": <url>}
-            #     {"webhook": <url>, "tags": "translator"} # project specific
-            # ]
-            for slack in getattr(self.web_settings, "SLACK_WEBHOOKS", []):
-
-                if "tags" in slack:
-                    if slack["tags"] == "translator":
-                        if "x-translator" in smartapi["info"]:
-                            res = await client.fetch(
-                                slack["webhook"], method='POST',
-                                headers={'content-type': 'application/json'},
-                                body=json.dumps(SlackNewTranslatorAPIMessage(**kwargs).compose()),
-                            )
-                            logging.info(res.code)
-                            logging.info(res.body)
-
-                    # elif slack["tags"] == <other>:
-                    #   pass
-
-                else:  # typical case
-                    res = await client.fetch(
-                        slack["webhook"], method='POST',
-                        headers={'content-type': 'application/json'},
-                        body=json.dumps(SlackNewAPIMessage(**kwargs).compose()),
-                    )
-                    logging.info(res.code)
-                    logging.info(res.body)
-
-        except Exception as exc:
-            logging.error(str(exc))
+        # NOTE
+        # SLACK_WEBHOOKS = [
+        #     {"webhook": <url>}
+        #     {"webhook": <url>, "tags": "translator"} # project specific
+        # ]
+        for slack in getattr(self.web_settings, "SLACK_WEBHOOKS", []):
+
+            if "tags" in slack:
+                if slack["tags"] == "translator":
+                    if "x-translator" in smartapi["info"]:
+                        self.notifications.notify(
+                            slack["webhook"], SlackNewTranslatorAPIMessage(**kwargs))
+
+                # elif slack["tags"] == <other>:
+                #   pass
+
+            else:  # typical case
+                self.notifications.notify(
+                    slack["webhook"], SlackNewAPIMessage(**kwargs))
 
     @github_authenticated
     async def put(self, _id):
@@ -371,7 +599,7 @@ class SmartAPIHandler(BaseHandler, SmartAPIReadOnlyHandler):
         """
 
         try:
-            smartapi = SmartAPI.get(_id)
+            smartapi = await SmartAPI.get_async(self.es_client, _id, meta_only=True)
         except NotFoundError:
             raise HTTPError(404)
 
@@ -385,7 +613,7 @@ class SmartAPIHandler(BaseHandler, SmartAPIReadOnlyHandler):
 
             try:  # update slug
                 smartapi.slug = self.args.slug or None
-                smartapi.save()
+                await smartapi.save_async(self.es_client)
 
             except (ControllerError, ValueError) as err:
                 raise BadRequest(details=str(err)) from err
@@ -393,9 +621,19 @@ class SmartAPIHandler(BaseHandler, SmartAPIReadOnlyHandler):
             self.finish({'success': True})
 
         else:  # refresh
-            file = await download_async(smartapi.url, raise_error=False)
-            code = smartapi.refresh(file)
-            smartapi.save()
+            file = await download_async(
+                smartapi.url, raise_error=False,
+                headers=smartapi.webdoc.headers)
+            try:  # compared with the file
+                if not smartapi.webdoc.unchanged(file):
+                    await smartapi.fetch_async(self.es_client)
+                smartapi = await self.pool.run(refresh, smartapi, file)
+            except NotFoundError:
+                raise HTTPError(404)
+            except PoolError as err:
+                raise HTTPError(503, reason=str(err)) from err
+            code = smartapi.webdoc.status
+            await smartapi.save_async(self.es_client)
 
             try:
                 status = smartapi.webdoc.STATUS(code)
@@ -410,13 +648,13 @@ class SmartAPIHandler(BaseHandler, SmartAPIReadOnlyHandler):
             })
 
     @github_authenticated
-    def delete(self, _id):
+    async def delete(self, _id):
         """
         Delete API
         """
 
         try:
-            smartapi = SmartAPI.get(_id)
+            smartapi = await SmartAPI.get_async(self.es_client, _id, meta_only=True)
         except NotFoundError:
             raise HTTPError(404)
 
@@ -424,13 +662,36 @@ class SmartAPIHandler(BaseHandler, SmartAPIReadOnlyHandler):
             raise HTTPError(403)
 
         try:
-            _id = smartapi.delete()
+            _id = await smartapi.delete_async(self.es_client)
         except ControllerError as err:
             raise BadRequest(details=str(err)) from err
 
         self.finish({'success': True, '_id': _id})
 
 
+class SuggestHandler(BaseHandler):
+    """
+    Autocomplete what users type in the search box.
+    Small and fast enough to request on every keypress.
+
+    GET /api/suggest?q=<prefix>
+    """
+
+    kwargs = {
+        'GET': {
+            'q': {'type': str, 'required': True},
+            'size': {'type': int, 'default': 10, 'max': 100}
+        },
+    }
+
+    name = 'suggest'
+
+    async def get(self):
+        res = await SmartAPI.suggest_async(
+            self.es_client, self.args.q, self.args.size)
+        self.finish(res)
+
+
 class ValueSuggestionHandler(BaseHandler):
     """
     Handle field aggregation for UI suggestions
@@ -444,11 +705,35 @@ class ValueSuggestionHandler(BaseHandler):
 
     name = 'value_suggestion'
 
-    def get(self):
+    async def get(self):
         """
         /api/suggestion?field=
         Returns aggregations for any field provided
         Used for tag:count on registry
+        The common ones are refreshed in the
+        background, see index.run_precompute.
         """
-        res = SmartAPI.get_tags(self.args.field)
+        res = await aggregations.get(self.es_client, self.args.field)
         self.finish(res)
+
+
+class StatsHandler(BaseHandler):
+    """
+    Report the in-process caches and how often they
+    are hit, to size them, since the process started.
+
+    GET /api/stats
+    """
+
+    name = 'stats'
+
+    def get(self):
+        self.finish({
+            "caches": {
+                "verdicts": ValidateHandler.verdicts.stats(),
+                "documents": documents.stats(),  # decoded
+                "responses": SmartAPIReadOnlyHandler.responses.stats(),
+                "tokens": BaseHandler.tokens.stats()
+            },
+            "connections": session.stats()
+        })
@@ -3,11 +3,13 @@
 from threading import Thread
 
 from aiocron import crontab
-from biothings.web.index_base import main
-from tornado.ioloop import IOLoop
+from biothings.web import BiothingsAPI
+from biothings.web.index_base import options
+from tornado.ioloop import IOLoop, PeriodicCallback
 from tornado.web import RequestHandler
 
 from admin import routine
+from controller import aggregations, refresh_schemas
 from utils.indices import setup
 
 
@@ -16,6 +18,19 @@ def run_routine():
     thread.start()
 
 
+def run_refresh_schemas():
+    # the schemas loaded from the local
+    # cache at import may be outdated.
+    thread = Thread(target=refresh_schemas, daemon=True)
+    thread.start()
+
+
+def run_precompute(client):
+    # the common aggregations of the registry
+    # pages, see handlers.ValueSuggestionHandler.
+    IOLoop.current().spawn_callback(aggregations.precompute, client)
+
+
 class WebAppHandler(RequestHandler):
     def get(self):
         self.render('../web-app/dist/index.html')
@@ -23,9 +38,10 @@ class WebAppHandler(RequestHandler):
 
 if __name__ == '__main__':
 
-    crontab('0 0 * * *', func=run_routine, start=True)
-    IOLoop.current().add_callback(setup)
-    main([
+    # same as biothings.web.index_base.main, with
+    # access to the application's async es client.
+    api = BiothingsAPI(options.conf)
+    api.handlers = [
         (r"/user/?", "handlers.UserInfoHandler"),
         (r"/login/?", "handlers.LoginHandler"),
         (r"/oauth", "handlers.GithubLoginHandler"),
@@ -33,7 +49,21 @@ if __name__ == '__main__':
         (r'/sitemap.xml()', "tornado.web.StaticFileHandler", {'path': '../web-app/dist/sitemap.xml'}),
         (r"/((?:img|css|js|fonts)/.*)", "tornado.web.StaticFileHandler", {
             "path": "../web-app/dist/"
-        })], {
+        })]
+    api.settings.update({
         "default_handler_class": WebAppHandler,
         "static_path": "../web-app/dist/",
-    }, use_curl=True)
+    })
+    api.use_curl()
+    api.host = options.address
+    api.update(debug=options.debug)
+    api.update(autoreload=options.autoreload)
+
+    client = api.config.connections.async_client
+
+    crontab('0 0 * * *', func=run_routine, start=True)
+    IOLoop.current().add_callback(setup)
+    IOLoop.current().add_callback(run_refresh_schemas)
+    PeriodicCallback(lambda: run_precompute(client), 60000).start()
+
+    api.start(options.port)
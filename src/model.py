@@ -11,15 +11,28 @@ from elasticsearch_dsl import *
 # parse environment variables
 ES_HOST = os.getenv('ES_HOST', 'localhost:9200')
 ES_INDEX_NAME = 'smartapi_docs'
+ES_BLOB_INDEX_NAME = 'smartapi_blobs'
+
+# completion suggester subfields
+# autocomplete these as users type
+SUGGEST_FIELDS = (
+    "info.title", "_meta.slug",
+    "tags.name", "info.contact.name"
+)
 
 # create a default connection
 connections.create_connection(hosts=ES_HOST)
 
 
+class Flattened(Field):
+    """ Not in this version of elasticsearch-dsl. """
+    name = 'flattened'
+
+
 class UserMeta(InnerDoc):
     """ The _meta field. """
     url = Keyword(required=True)
-    slug = Keyword()  # url shortcut
+    slug = Keyword(fields={"suggest": Completion()})  # url shortcut
     username = Keyword(required=True)
     date_created = Date(default_timezone='UTC')
     last_updated = Date(default_timezone='UTC')
@@ -34,18 +47,48 @@ class StatMeta(InnerDoc):
     refresh_status = Integer()
     refresh_ts = Date()
 
+    # validators of the document last accepted,
+    # to download it only if it has changed,
+    # see utils.downloader.last_modified.
+    refresh_etag = Keyword(index=False)
+    refresh_date = Date(default_timezone='UTC', index=False)
+
+
+class APIBlob(Document):
+    """ Raw document content, see utils.blobs. """
+
+    data = Binary()  # compressed
+    trained = Date(default_timezone='UTC')  # zstd dictionaries only
+
+    class Index:
+        """
+        Index Settings
+        """
+        name = ES_BLOB_INDEX_NAME
+        settings = {
+            "number_of_shards": 1,
+            "number_of_replicas": 0
+        }
+
 
 class APIDoc(Document):
 
     _meta = Object(UserMeta, required=True)
     _status = Object(StatMeta)
-    _raw = Binary()
+    _blob = Keyword()  # key in utils.blobs
+    _raw = Binary()  # saved before the blob store
 
     info = Object()
     paths = Object(
         properties={
             "path": Text(),
-            "pathitem": Object()
+            # operations are deep and their fields
+            # are user defined, index their values
+            # as keywords under a single field.
+            "pathitem": Flattened(depth_limit=50, ignore_above=256),
+            # their summaries and descriptions,
+            # searchable as text, see controller.
+            "operations": Text()
         })
     tags = Object(multi=True)
     openapi = Text()
@@ -70,7 +113,28 @@ class APIDoc(Document):
             "number_of_shards": 1,
             "number_of_replicas": 0,
             "mapping.ignore_malformed": True,
-            "mapping.total_fields.limit": 2500
+            # see utils/mapping.json and utils.indices.stats
+            "mapping.total_fields.limit": 2500,
+            # index word prefixes for search as you type,
+            # used by the .prefix fields in mapping.json.
+            # numbers in strings, as elasticsearch returns
+            # them, see utils.indices.setup.
+            "analysis": {
+                "filter": {
+                    "prefix": {
+                        "type": "edge_ngram",
+                        "min_gram": "1",
+                        "max_gram": "20"
+                    }
+                },
+                "analyzer": {
+                    "prefix": {
+                        "type": "custom",
+                        "tokenizer": "standard",
+                        "filter": ["lowercase", "prefix"]
+                    }
+                }
+            }
         }
 
     @classmethod
@@ -81,27 +145,185 @@ class APIDoc(Document):
         any follow up operations like Document.get(_id).
         """
         search = cls.search().query('match', **{field: value})
-        if search.count():
-            return next(iter(search)).meta.id
-        return None
+        search = search.source(False)[:1]  # single request
+        hits = search.execute().hits
+        return hits[0].meta.id if hits else None
 
     @classmethod
-    def aggregate(cls, field="tags.name"):
+    def resolve(cls, value, field="_meta.slug"):
         """
-        Perform terms aggregation on a keyword field.
-        Add multi-field keyword indexing suffix automatically.
+        Return the _id of the document with a keyword field
+        equal to the value, or None if there isn't one.
+        """
+        search = cls.search().filter('term', **{field: value})
+        hits = search.source(False)[:1].execute().hits
+        return hits[0].meta.id if hits else None
+
+    @classmethod
+    def resolve_many(cls, values, field="_meta.slug"):
+        """
+        Resolve multiple values in one multi-search request.
+        Return a dict of value and _id or None pairs.
         """
+        values = list(values)
+        if not values:
+            return {}
+
+        msearch = MultiSearch()
+        for value in values:
+            search = cls.search().filter('term', **{field: value})
+            msearch = msearch.add(search.source(False)[:1])
+
+        return {
+            value: response.hits[0].meta.id if response.hits else None
+            for value, response in zip(values, msearch.execute())
+        }
+
+    @classmethod
+    def patch(cls, _id, doc):
+        """
+        Partially update a document with the fields in doc.
+        Unlike Document.update, fields set to None are cleared.
+        Raise NotFoundError if the document doesn't exist.
+        """
+        cls._get_connection().update(
+            index=cls.Index.name, id=_id, body={"doc": doc})
+
+    @classmethod
+    def _aggregation(cls, field, size):
 
         if not field.endswith(".raw") and not field.startswith("_"):
             field = field + ".raw"  # so that it's a keyword field
 
         # build the aggregation query
-        agg = A('terms', field=field, size=25)
-        search = cls.search()
+        agg = A('terms', field=field, size=size)
+        search = cls.search()[:0]  # no hits
         search.aggs.bucket("aggs", agg)
 
+        return search
+
+    @classmethod
+    def aggregate(cls, field="tags.name", size=25):
+        """
+        Perform terms aggregation on a keyword field.
+        Add multi-field keyword indexing suffix automatically.
+        """
+        search = cls._aggregation(field, size)
+
         # transform the response to a simpler format
         buckets = search.execute().aggregations.aggs.buckets
         result = {b['key']: b['doc_count'] for b in buckets}
 
         return result
+
+    # ASYNC
+    # Counterparts of the operations above
+    # taking an async elasticsearch client,
+    # so that web handlers don't block.
+
+    @classmethod
+    async def get_async(cls, client, _id, **kwargs):
+        """
+        Same as Document.get, using an async elasticsearch client.
+        Raise NotFoundError if the document doesn't exist.
+        """
+        response = await client.get(index=cls.Index.name, id=_id, **kwargs)
+        return cls.from_es(response)
+
+    @classmethod
+    async def exists_async(cls, client, value, field="_id"):
+        """
+        Same as exists, using an async elasticsearch client.
+        """
+        search = cls.search().query('match', **{field: value})
+        search = search.source(False)[:1]
+
+        response = await client.search(
+            index=cls.Index.name, body=search.to_dict())
+
+        hits = response['hits']['hits']
+        return hits[0]['_id'] if hits else None
+
+    @classmethod
+    async def resolve_async(cls, client, value, field="_meta.slug"):
+        """
+        Same as resolve, using an async elasticsearch client.
+        """
+        search = cls.search().filter('term', **{field: value})
+        search = search.source(False)[:1]
+
+        response = await client.search(
+            index=cls.Index.name, body=search.to_dict())
+
+        hits = response['hits']['hits']
+        return hits[0]['_id'] if hits else None
+
+    @classmethod
+    async def patch_async(cls, client, _id, doc):
+        """
+        Same as patch, using an async elasticsearch client.
+        """
+        await client.update(
+            index=cls.Index.name, id=_id, body={"doc": doc})
+
+    @classmethod
+    async def delete_async(cls, client, _id):
+        """
+        Delete a document by _id, using an async elasticsearch client.
+        Raise NotFoundError if the document doesn't exist.
+        """
+        await client.delete(index=cls.Index.name, id=_id)
+
+    async def save_async(self, client):
+        """
+        Same as Document.save(skip_empty=False),
+        using an async elasticsearch client.
+        """
+        self.full_clean()
+        await client.index(
+            index=self.Index.name, id=self.meta.id,
+            body=self.to_dict(skip_empty=False))
+
+    @classmethod
+    async def aggregate_async(cls, client, field="tags.name", size=25):
+        """
+        Same as aggregate, using an async elasticsearch client.
+        """
+        search = cls._aggregation(field, size)
+
+        response = await client.search(
+            index=cls.Index.name, body=search.to_dict())
+
+        buckets = response['aggregations']['aggs']['buckets']
+        result = {b['key']: b['doc_count'] for b in buckets}
+
+        return result
+
+    @classmethod
+    async def suggest_async(cls, client, prefix, size=10):
+        """
+        Complete a prefix with the values of SUGGEST_FIELDS,
+        using an async elasticsearch client. Return a list of
+        the field, completed text and _id of a document.
+        """
+        search = cls.search().source(False)[:0]
+        for field in SUGGEST_FIELDS:
+            search = search.suggest(field, prefix, completion={
+                "field": field + ".suggest",
+                "skip_duplicates": True,
+                "size": size
+            })
+
+        response = await client.search(
+            index=cls.Index.name, body=search.to_dict())
+
+        result = []
+        for field in SUGGEST_FIELDS:
+            for option in response['suggest'][field][0]['options']:
+                result.append({
+                    "field": field,
+                    "text": option['text'],
+                    "_id": option['_id']
+                })
+
+        return result[:size]
@@ -1,11 +1,29 @@
 
+import logging
 from base64 import b64decode
 
 from biothings.utils.web.es_dsl import AsyncSearch
-from biothings.web.pipeline import ESQueryBuilder, ESResultTransform
+from biothings.web.pipeline import (ESQueryBackend, ESQueryBuilder,
+                                    ESResultTransform)
 
-from controller import OpenAPI, Swagger
+from controller import OpenAPI, Swagger, blobs
 from utils import decoder
+from utils.cache import LRUCache
+
+# decoded documents, keyed by blob key, or _id and
+# last updated time, for those saved before the blob
+# store, sized by raw bytes.
+documents = LRUCache(maxsize=4096, maxbytes=64 * 1024 ** 2)
+
+
+def _copy(obj):
+    # decoded documents only contain dicts, lists and
+    # immutable values, faster than copy.deepcopy.
+    if isinstance(obj, dict):
+        return {key: _copy(val) for key, val in obj.items()}
+    if isinstance(obj, list):
+        return [_copy(val) for val in obj]
+    return obj
 
 
 class SmartAPIQueryBuilder(ESQueryBuilder):
@@ -55,8 +73,9 @@ class SmartAPIQueryBuilder(ESQueryBuilder):
                             # ---------------------------------------------
                             {"query_string": {"query": q}},  # base score
                             # ---------------------------------------------
-                            {"wildcard": {"info.title": {"value": q + "*", "boost": 0.8}}},
-                            {"wildcard": {"info.description": {"value": q + "*", "boost": 0.5}}},
+                            # word prefixes, see utils/mapping.json
+                            {"match": {"info.title.prefix": {"query": q, "operator": "AND", "boost": 0.8}}},
+                            {"match": {"info.description.prefix": {"query": q, "operator": "AND", "boost": 0.5}}},
                         ]
                     }
                 }
@@ -65,7 +84,7 @@ class SmartAPIQueryBuilder(ESQueryBuilder):
             search = search.update_from_dict(query)
 
         search = search.params(rest_total_hits_as_int=True)
-        search = search.source(exclude=['_raw'], include=options._source)
+        search = search.source(exclude=['_raw', '_blob'], include=options._source)
 
         if options.authors:  # '"Chunlei Wu"'
             search = search.filter('terms', info__contact__name__raw=options.authors)
@@ -118,8 +137,81 @@ class SmartAPIQueryBuilder(ESQueryBuilder):
         return search
 
 
+class SmartAPIQueryBackend(ESQueryBackend):
+
+    async def execute(self, query, options):
+        """
+        Attach the decoded documents of the hits, from the
+        decoded document cache, or loaded from the blob store
+        asynchronously, see SmartAPIResultTransform.decode.
+        """
+        res = await super().execute(query, options)
+
+        hits = []
+        for response in res if isinstance(res, list) else [res]:
+            if isinstance(response, dict):
+                for hit in response.get('hits', {}).get('hits', ()):
+                    if hit.get('_source', {}).get('_blob'):
+                        hits.append(hit)
+
+        decoded = {}
+        for hit in hits:
+            key = hit['_source']['_blob']
+            if key not in decoded:
+                decoded[key] = documents.get(key)
+        missing = [key for key, _dict in decoded.items() if _dict is None]
+        if missing:
+            raws = await blobs.get_many_async(self.client, missing)
+            for key, raw in raws.items():
+                decoded[key] = decoder.to_dict(raw)
+                documents.set(key, decoded[key], size=len(raw))
+
+        # not only cached, they can be evicted
+        # before the hits are transformed.
+        for hit in hits:
+            hit['_source']['_decoded'] = decoded[hit['_source']['_blob']]
+
+        return res
+
+
 class SmartAPIResultTransform(ESResultTransform):
 
+    @staticmethod
+    def decode(doc):
+        """
+        Decode the raw document of a hit into a dict,
+        attached by SmartAPIQueryBackend from the blob store,
+        or from the _raw field of those saved before it.
+        Documents are only parsed again when they are
+        updated, and each hit gets its own copy.
+        """
+        _raw = doc.pop('_raw', None)
+        _blob = doc.pop('_blob', None)
+        _decoded = doc.pop('_decoded', None)
+
+        if _blob:  # content addressed, no i/o here
+            if _decoded is None:
+                logging.error("Missing blob %s of %s.", _blob, doc.get('_id'))
+                return {}
+            return _copy(_decoded)
+
+        try:
+            key = (doc['_id'], doc['_meta']['last_updated'])
+        except (KeyError, TypeError):
+            key = None  # _meta not requested
+
+        _dict = documents.get(key) if key else None
+        if _dict is None:
+            if _raw:
+                _raw = decoder.decompress(b64decode(_raw))
+            else:  # nothing saved
+                return {}
+            _dict = decoder.to_dict(_raw)
+            if key:
+                documents.set(key, _dict, size=len(_raw))
+
+        return _copy(_dict)
+
     def transform_hit(self, path, doc, options):
 
         if path == '':
@@ -131,11 +223,8 @@ class SmartAPIResultTransform(ESResultTransform):
 
             # OVERRIDE STARTS HERE
 
-            if "_raw" in doc:
-                _raw = b64decode(doc.pop('_raw'))
-                _raw = decoder.decompress(_raw)
-                _raw = decoder.to_dict(_raw)
-                doc.update(_raw)
+            if "_raw" in doc or "_blob" in doc:
+                doc.update(self.decode(doc))
 
             if options.raw == 0:
                 for key in list(doc.keys()):
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+from utils.blobs import BlobStore, FileStore
+
+dirname = os.path.dirname(__file__)
+
+with open(os.path.join(dirname, '../mygene.yml'), 'rb') as file:
+    MYGENE_RAW = file.read()
+
+
+def test_file_store(tmp_path):
+    store = FileStore(str(tmp_path))
+    key = store.put(MYGENE_RAW)
+    assert key == store.key(MYGENE_RAW)
+    assert store.get(key) == MYGENE_RAW
+    assert store.put(MYGENE_RAW) == key  # stored once
+    assert len(list(tmp_path.glob('*/*'))) == 1
+    with pytest.raises(KeyError):
+        store.get(store.key(b'notexist'))
+
+
+def test_file_store_many(tmp_path):
+    store = FileStore(str(tmp_path))
+    keys = store.put_many([MYGENE_RAW, b'openapi: 3.0.0', MYGENE_RAW])
+    assert keys[0] == keys[2] != keys[1]
+    assert store.get(keys[1]) == b'openapi: 3.0.0'
+
+
+def test_file_store_get_many(tmp_path):
+    store = FileStore(str(tmp_path))
+    keys = store.put_many([MYGENE_RAW, b'openapi: 3.0.0'])
+    missing = store.key(b'notexist')
+    assert store.get_many(keys + [missing]) == dict(zip(keys, [MYGENE_RAW, b'openapi: 3.0.0']))
+    assert store.get_many([]) == {}
+
+
+def test_file_store_dictionaries(tmp_path):
+    store = FileStore(str(tmp_path))
+    assert store.get_dictionaries() == []
+    store.put_dictionary(1, b'first')
+    store.put_dictionary(2, b'second')
+    os.utime(tmp_path / 'zdict' / '1', (0, 0))  # oldest
+    assert store.get_dictionaries() == [b'first', b'second']
+
+
+def test_blob_store_abstract():
+    with pytest.raises(TypeError):
+        BlobStore()
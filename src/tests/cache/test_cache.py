@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from utils.cache import LRUCache, SingleFlight
+
+
+def test_lru():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)  # evicts b
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert 'c' in cache and 'b' not in cache
+    assert cache.stats()['hits'] == 3
+    assert cache.stats()['misses'] == 1
+    assert cache.pop('a') == 1
+    assert len(cache) == 1
+    cache.clear()
+    assert not len(cache)
+
+
+def test_ttl():
+    cache = LRUCache(ttl=0.05)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=10)
+    assert cache.get('a') == 1
+    time.sleep(0.1)
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+
+
+def test_maxbytes():
+    cache = LRUCache(maxbytes=10)
+    cache.set('a', 1, size=4)
+    cache.set('b', 2, size=4)
+    assert cache.bytes == 8
+    cache.set('c', 3, size=4)  # evicts a
+    assert cache.get('a') is None
+    assert cache.bytes == 8
+    cache.set('b', 2, size=2)  # replaces b
+    assert cache.bytes == 6
+    cache.set('d', 4, size=20)  # too large
+    assert cache.get('d') is None
+    assert cache.get('b') == 2
+    assert cache.pop('c') == 3
+    assert cache.stats()['bytes'] == 2
+
+
+def test_single_flight():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        if value is None:
+            raise ValueError()
+        return value
+
+    async def main():
+        results = await asyncio.gather(
+            flights.run('a', fetch, 1),
+            flights.run('a', fetch, 2),
+            flights.run('b', fetch, 3))
+        assert results == [1, 1, 3]
+        assert calls == [1, 3]
+        assert not len(flights)
+        assert await flights.run('a', fetch, 4) == 4  # completed before
+        errors = await asyncio.gather(
+            flights.run('c', fetch, None),
+            flights.run('c', fetch, None),
+            return_exceptions=True)
+        assert all(isinstance(error, ValueError) for error in errors)
+        assert calls == [1, 3, 4, None]
+
+    asyncio.get_event_loop().run_until_complete(main())
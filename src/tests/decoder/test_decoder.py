@@ -1,7 +1,9 @@
+import gzip
 import os
 
 import pytest
 from utils import decoder
+from utils.blobs import FileStore
 
 dirname = os.path.dirname(__file__)
 
@@ -97,3 +99,77 @@ def test_javascript():
     assert doc["type"] == "object"
     assert "$schema" in doc
     assert "required" in doc
+
+
+def test_sniff():
+    assert decoder.sniff(JSON) == 'json'
+    assert decoder.sniff(JSON.decode()) == 'json'
+    assert decoder.sniff(b'\xef\xbb\xbf \n{}') == 'json'
+    assert decoder.sniff(YAML) == 'yaml'
+    assert decoder.sniff(b'') == 'yaml'
+
+
+def test_usage():
+    usage = dict(decoder.usage)
+    _ok(decoder.to_dict(JSON))
+    assert decoder.usage['json'] == usage.get('json', 0) + 1
+    _ok(decoder.to_dict(YAML))
+    assert decoder.usage['yaml'] == usage.get('yaml', 0) + 1
+    # yaml flow mapping, not json
+    assert decoder.to_dict(b'{a: 1}') == {'a': 1}
+    assert decoder.usage['yaml'] == usage.get('yaml', 0) + 2
+    # json parsed as json, not yaml 1.1
+    assert decoder.to_dict(b'{"a": 1e3}') == {'a': 1000.0}
+
+
+def test_compress_legacy():
+    # documents stored before zstd
+    assert decoder.decompress(gzip.compress(JSON)) == JSON
+    assert decoder.decompress(b'') is None
+    with pytest.raises(ValueError):
+        decoder.decompress(JSON)
+
+
+def test_compress_zstd():
+    pytest.importorskip("zstandard")
+    compression = decoder.Compression()
+    data = compression.compress(YAML)
+    assert data.startswith(decoder.ZSTD_MAGIC)
+    assert len(data) < len(YAML)
+    assert compression.decompress(data) == YAML
+
+
+def test_compress_dictionary(tmp_path):
+    pytest.importorskip("zstandard")
+    compression = decoder.Compression()
+    compression.load(FileStore(str(tmp_path)))
+    samples = [doc[i:i + 1024] for doc in (YAML, JSON, JSTS) for i in range(0, len(doc), 1024)]
+    dictionary = compression.train(samples, size=8192)
+    data = compression.compress(JSON)
+    assert compression.decompress(data) == JSON
+    assert len(data) < len(decoder.Compression().compress(JSON))
+
+    # in another process
+    compression = decoder.Compression()
+    with pytest.raises(ValueError):
+        compression.decompress(data)
+    compression.load(FileStore(str(tmp_path)))
+    assert compression.decompress(data) == JSON  # loaded on demand
+    compression = decoder.Compression()
+    compression.load(FileStore(str(tmp_path)))
+    compression.compress(JSON)  # loaded on first use
+    assert compression.dictionary.dict_id() == dictionary.dict_id()
+    assert compression.decompress(data) == JSON
+
+
+def test_compress_dictionary_save(tmp_path):
+    pytest.importorskip("zstandard")
+    compression = decoder.Compression()
+    samples = [doc[i:i + 1024] for doc in (YAML, JSON, JSTS) for i in range(0, len(doc), 1024)]
+    dictionary = compression.train(samples, size=8192)
+
+    # the store emptied, like the index in admin.remap
+    store = FileStore(str(tmp_path))
+    compression.load(store)
+    compression.save()
+    assert store.get_dictionaries() == [dictionary.as_bytes()]
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import threading
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+from utils.blobs import BlobStore
+from utils.downloader import (DownloadError, Downloader, conditional_headers,
+                              download, download_async, last_modified)
+
+dirname = os.path.dirname(__file__)
+
+
+class Handler(SimpleHTTPRequestHandler):
+
+    requests = []
+
+    def send_head(self):
+        self.requests.append((self.path, self.headers.get('If-Modified-Since')))
+        return super().send_head()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    handler = partial(Handler, directory=os.path.join(dirname, '../decoder'))
+    httpd = HTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%s/' % httpd.server_port
+    httpd.shutdown()
+
+
+def test_load(server, tmp_path):
+    names = ['mydisease', 'swagger']
+    urls = [server + 'doc_mydisease.yaml', server + 'doc_swagger2.js']
+
+    downloader = Downloader(str(tmp_path))
+    assert downloader.load(names, urls) == []  # downloaded
+    assert downloader['mydisease']['openapi']
+    assert downloader['swagger']['type'] == 'object'
+    assert os.path.exists(tmp_path / 'mydisease.json')
+
+    Handler.requests.clear()
+    downloader = Downloader(str(tmp_path))
+    assert downloader.load(names, urls) == names  # from disk
+    assert downloader['mydisease']['openapi']
+    assert not Handler.requests
+
+    mapping = downloader.data
+    assert downloader.refresh(names, urls) == []  # not modified
+    assert all(since for _, since in Handler.requests)
+    assert downloader.data is mapping
+
+    downloader = Downloader(str(tmp_path))
+    assert downloader.load(names[:1], urls[1:]) == []  # url changed
+    assert downloader['mydisease']['type'] == 'object'
+
+
+def test_conditional(server):
+    url = server + 'doc_mydisease.yaml'
+    file = download(url)
+    assert file.status == 200 and file.raw
+    assert file.modified <= file.date  # the file time, not the response time
+    assert last_modified(file) == file.modified
+    assert last_modified(file._replace(modified=None)) == file.date
+
+    headers = conditional_headers(file.etag, last_modified(file))
+    assert headers['If-Modified-Since'].endswith('GMT')
+    assert 'If-None-Match' not in headers  # no etag from this server
+
+    file = download(url, headers=headers)
+    assert file.status == 304 and not file.raw
+
+    file = asyncio.get_event_loop().run_until_complete(
+        download_async(url, raise_error=False, headers=headers))
+    assert file.status == 304 and not file.raw
+
+    assert conditional_headers('abc') == {'If-None-Match': '"abc"'}
+    assert conditional_headers() == {}
+
+
+def test_max_size(server):
+    url = server + 'doc_mydisease.yaml'
+    with open(os.path.join(dirname, '../decoder/doc_mydisease.yaml'), 'rb') as file:
+        raw = file.read()
+
+    file = download(url, max_size=len(raw))
+    assert file.raw == raw
+    assert file.digest == BlobStore.key(raw)
+
+    with pytest.raises(DownloadError):
+        download(url, max_size=len(raw) - 1)
+    assert download(url, raise_error=False, max_size=1024).status == 413
+
+    loop = asyncio.get_event_loop()
+    file = loop.run_until_complete(download_async(url, max_size=len(raw)))
+    assert file.raw == raw
+    assert file.digest == BlobStore.key(raw)
+
+    with pytest.raises(DownloadError):
+        loop.run_until_complete(download_async(url, max_size=1024))
+    file = loop.run_until_complete(download_async(url, raise_error=False, max_size=1024))
+    assert file.status == 413 and file.raw is None
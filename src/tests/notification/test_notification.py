@@ -0,0 +1,87 @@
+import asyncio
+
+from utils.notification import (Dispatcher, LocalSink, SlackDigestMessage,
+                                SlackNewAPIMessage, SlackNewTranslatorAPIMessage)
+
+WEBHOOK = "http://localhost/webhook"
+
+
+def _message(n):
+    return SlackNewAPIMessage(f"0x{n}", f"API {n}", "An API.", "tester")
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_deliver():
+    sink = LocalSink()
+    dispatcher = Dispatcher(sink)
+
+    async def main():
+        dispatcher.notify(WEBHOOK, _message(1))
+        dispatcher.notify(WEBHOOK, _message(2))
+        await dispatcher.join()
+
+    _run(main())
+    dispatcher.stop()
+    assert sink.calls == 2
+    texts = {payload["text"] for _, payload in sink.payloads}
+    assert texts == {_message(1).compose()["text"], _message(2).compose()["text"]}
+
+
+def test_retry():
+    sink = LocalSink(failures=2)
+    dispatcher = Dispatcher(sink, retries=2, backoff=0.001)
+
+    async def main():
+        dispatcher.notify(WEBHOOK, _message(1))
+        await dispatcher.join()
+        sink.failures = 5  # more than retries
+        dispatcher.notify(WEBHOOK, _message(2))
+        await dispatcher.join()
+
+    _run(main())
+    dispatcher.stop()
+    assert sink.calls == 6
+    assert sink.payloads == [(WEBHOOK, _message(1).compose())]
+
+
+def test_digest():
+    sink = LocalSink()
+    dispatcher = Dispatcher(sink, digest=0.01)
+
+    async def main():
+        for n in range(20):
+            dispatcher.notify(WEBHOOK, _message(n))
+        dispatcher.notify("http://localhost/other", _message(20))
+        await asyncio.sleep(0.05)
+        await dispatcher.join()
+
+    _run(main())
+    dispatcher.stop()
+    assert sink.calls == 2
+    payloads = dict(sink.payloads)
+    assert payloads[WEBHOOK] == SlackDigestMessage([_message(n) for n in range(20)]).compose()
+    assert payloads[WEBHOOK]["text"].startswith("20 new APIs")
+    assert len(payloads[WEBHOOK]["blocks"]) <= 50
+    assert payloads["http://localhost/other"] == _message(20).compose()
+
+
+def test_bounded():
+    sink = LocalSink()
+    dispatcher = Dispatcher(sink, maxsize=2, concurrency=1)
+
+    async def main():
+        for n in range(5):  # before the worker runs
+            dispatcher.notify(WEBHOOK, _message(n))
+        await dispatcher.join()
+
+    _run(main())
+    dispatcher.stop()
+    assert sink.calls == 2
+
+
+def test_translator():
+    message = SlackNewTranslatorAPIMessage("0x1", "API", "An API.", "tester")
+    assert "Translator" in message.compose()["text"]
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import time
+
+import pytest
+from utils.pool import PoolError, ProcessPool
+
+
+def _pid():
+    return os.getpid()
+
+
+def _sleep(seconds):
+    try:
+        time.sleep(seconds)
+    except Exception:  # cannot swallow the timeout
+        pass
+    return seconds
+
+
+def _allocate(size):
+    return len(bytearray(size))
+
+
+def _fail():
+    raise ValueError("failed")
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_inline():
+    pool = ProcessPool()
+    assert run(pool.run(_pid)) == os.getpid()
+    with pytest.raises(ValueError):
+        run(pool.run(_fail))
+
+
+def test_process():
+    pool = ProcessPool(1, timeout=0.5, memory=4 * 1024 ** 3)
+    try:
+        assert run(pool.run(_pid)) != os.getpid()
+        assert run(pool.run(_sleep, 0.1)) == 0.1
+        with pytest.raises(ValueError):
+            run(pool.run(_fail))
+        with pytest.raises(PoolError):
+            run(pool.run(_sleep, 5))
+        with pytest.raises(PoolError):
+            run(pool.run(_allocate, 8 * 1024 ** 3))
+        assert run(pool.run(_sleep, 0.1)) == 0.1  # still usable
+    finally:
+        pool.shutdown()
+
+
+def test_state():
+    state = ["v1"]
+    pool = ProcessPool(1, state=lambda: state[0])
+    try:
+        pid = run(pool.run(_pid))
+        assert run(pool.run(_pid)) == pid
+        state[0] = "v2"  # like schemas refreshed
+        assert run(pool.run(_pid)) != pid
+    finally:
+        pool.shutdown()
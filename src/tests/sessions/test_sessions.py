@@ -0,0 +1,48 @@
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from utils.sessions import Session
+
+dirname = os.path.dirname(__file__)
+
+
+class Handler(SimpleHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    handler = partial(Handler, directory=os.path.join(dirname, '../decoder'))
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%s/' % httpd.server_port
+    httpd.shutdown()
+
+
+def test_reuse(server):
+    session = Session()
+    for _ in range(3):
+        response = session.get(server + 'doc_mydisease.yaml')
+        assert response.status_code == 200
+    with session.get(server + 'doc_swagger2.js', stream=True) as response:
+        assert response.content
+    assert session.stats() == {"requests": 4, "opened": 1, "reused": 3}
+
+    session.reset()  # closes the connections
+    session.get(server + 'doc_mydisease.yaml')
+    assert session.stats()["opened"] == 2
+
+
+def test_timeout(server):
+    session = Session(timeout=0.001)
+    assert session.adapter.timeout == 0.001
+    session.get(server + 'doc_mydisease.yaml', timeout=5)  # overrides
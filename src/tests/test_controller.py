@@ -1,15 +1,20 @@
 """
 SmartAPI Controller Tests
 """
+import asyncio
 import json
 import os
+import pickle
 import time
 from datetime import datetime, timezone
 
 import elasticsearch
 import pytest
-from controller import ConflictError, ControllerError, NotFoundError, SmartAPI
-from model import APIDoc
+from controller import (ConflictError, ControllerError, NotFoundError, SmartAPI, blobs,
+                        check, resolver)
+from elasticsearch.helpers import BulkIndexError
+from elasticsearch_async import AsyncElasticsearch
+from model import ES_HOST, APIDoc
 from utils import decoder
 from utils.downloader import File
 from utils.indices import refresh, reset
@@ -94,6 +99,16 @@ def test_get_all_from():
     assert len(docs) == 1
 
 
+def test_get_all_batch():
+    """
+    SmartAPI.get_all(batch=1)
+    """
+    docs = list(SmartAPI.get_all(batch=1))
+    assert len(docs) == 2
+    assert {doc._id for doc in docs} == {MYGENE_ID, MYCHEM_ID}
+    assert {doc.raw for doc in docs} == {MYGENE_RAW, MYCHEM_RAW}
+
+
 def test_get():
     """
     smartapi = SmartAPI.get(_id)
@@ -128,6 +143,24 @@ def test_get():
         SmartAPI.get("NOTEXIST")
 
 
+def test_get_meta_only():
+    """
+    smartapi = SmartAPI.get(_id, meta_only=True)
+    """
+    mygene = SmartAPI.get(MYGENE_ID, meta_only=True)
+    assert mygene._id == MYGENE_ID
+    assert mygene.username == 'tester'
+    assert mygene.slug == 'mygene'
+    assert mygene.url == MYGENE_URL
+    assert mygene._raw is None  # deferred
+    assert mygene['info']['title'] == 'MyGene.info API'
+    assert mygene.raw == MYGENE_RAW
+    assert mygene.version == 'openapi'
+
+    with pytest.raises(NotFoundError):
+        SmartAPI.get("NOTEXIST", meta_only=True)
+
+
 def test_get_tags():
     """
     SmartAPI.get_tags()
@@ -156,6 +189,29 @@ def test_search():
     assert SmartAPI.find('drug', 'tags.name') == MYCHEM_ID
     assert SmartAPI.find(MYGENE_URL, 'url') == MYGENE_ID
     assert SmartAPI.find(MYCHEM_URL, 'url') == MYCHEM_ID
+    assert SmartAPI.find('mygen') is None
+    assert SmartAPI.find_many(['mygene', 'mychem', 'mygen']) == {
+        'mygene': MYGENE_ID, 'mychem': MYCHEM_ID, 'mygen': None
+    }
+    assert SmartAPI.find_many([MYGENE_URL], 'url') == {MYGENE_URL: MYGENE_ID}
+
+
+def test_save_stale_slug(bulk):
+    """
+    smartapi.save() with a stale cached slug
+    """
+    smartapi = SmartAPI(bulk[0])
+    smartapi.raw = MYGENE_RAW
+    smartapi.username = "tester"
+    smartapi.slug = "mygene"
+    # as if this document gave up the slug in another process
+    resolver._cache.set(("slug", "mygene"), smartapi._id)
+    try:
+        assert SmartAPI.find("mygene") == smartapi._id
+        with pytest.raises(ConflictError):
+            smartapi.save()
+    finally:
+        resolver.invalidate()
 
 
 def test_validation():
@@ -191,6 +247,31 @@ def test_validation():
         smartapi.validate()
 
 
+def test_validation_pickle():
+    """
+    pickle.loads(pickle.dumps(smartapi))
+    """
+    with open(os.path.join(dirname, './validate/openapi-pass.json'), 'rb') as file:
+        smartapi = SmartAPI(SmartAPI.VALIDATION_ONLY)
+        smartapi.raw = file.read()
+    _smartapi = pickle.loads(pickle.dumps(smartapi))
+    assert _smartapi.url is SmartAPI.VALIDATION_ONLY
+    assert dict(_smartapi) == dict(smartapi)
+    assert _smartapi.raw == smartapi.raw
+    with pytest.raises(ControllerError):
+        _smartapi.save()
+
+
+def test_check():
+    """
+    check(raw)
+    """
+    with open(os.path.join(dirname, './validate/openapi-pass.json'), 'rb') as file:
+        assert check(file.read()) == ('openapi', None)
+    version, error = check(b'{"openapi":"3.0.0"}')
+    assert version is None and error
+
+
 @pytest.fixture
 def openapi():
     yield '5f5141cbae5ca099d3f420f9c42c94cf'
@@ -277,6 +358,91 @@ def test_save(openapi):
         apidoc = APIDoc.get(smartapi._id)
         assert apidoc._meta.date_created == smartapi.date_created
         assert apidoc._meta.last_updated == smartapi.last_updated
+        # the raw document is stored out of the index
+        assert apidoc._raw is None
+        assert apidoc._blob == blobs.key(raw)
+        assert blobs.get(apidoc._blob) == raw
+        assert blobs.get_many([apidoc._blob, blobs.key(b'notexist')]) == {apidoc._blob: raw}
+        found = SmartAPI.get(smartapi._id)
+        assert found._deferred
+        assert pickle.loads(pickle.dumps(found))._deferred  # not loaded
+        assert found.raw == raw
+        # loaded in batches
+        found = {obj._id: obj for obj in SmartAPI.get_all(batch=1)}
+        assert not found[smartapi._id]._deferred
+        assert found[smartapi._id]._raw == raw
+
+
+@pytest.fixture
+def bulk():
+    urls = [f"http://example.com/bulk{n}.json" for n in range(3)]
+    yield urls
+    refresh()
+    for url in urls:
+        try:  # teardown
+            SmartAPI(url).delete()
+        except NotFoundError:
+            pass
+
+
+def test_save_many(bulk):
+    """
+    SmartAPI.save_many(smartapis)
+    """
+    with open(os.path.join(dirname, './validate/openapi-pass.json'), 'rb') as file:
+        raw = file.read()
+
+    smartapis = []
+    for url, slug in zip(bulk, ("bulk", "bulk", "mygene")):
+        smartapi = SmartAPI(url)
+        smartapi.raw = raw
+        smartapi.username = "tester"
+        smartapi.slug = slug
+        smartapis.append(smartapi)
+    invalid = SmartAPI("http://example.com/nousername.json")
+    invalid.raw = raw
+    smartapis.append(invalid)
+
+    results = dict(SmartAPI.save_many(smartapis, chunk_size=2))
+    assert results[smartapis[0]._id] is None
+    assert isinstance(results[smartapis[1]._id], ConflictError)  # same batch
+    assert isinstance(results[smartapis[2]._id], ConflictError)  # registered
+    assert isinstance(results[invalid._id], ControllerError)  # no username
+
+    refresh()
+    assert SmartAPI.find("bulk") == smartapis[0]._id
+    assert SmartAPI.get(smartapis[0]._id).raw == raw
+    assert not SmartAPI.exists(smartapis[1]._id)
+    assert SmartAPI.find("mygene") == MYGENE_ID
+
+
+def test_save_many_blob_errors(bulk, monkeypatch):
+    """
+    SmartAPI.save_many(smartapis) when some blobs are not stored
+    """
+    smartapis = []
+    for url in bulk[:2]:
+        smartapi = SmartAPI(url)
+        smartapi.raw = MYGENE_RAW.replace(b"MyGene", url.encode())
+        smartapi.username = "tester"
+        smartapis.append(smartapi)
+    failed = blobs.key(smartapis[1].raw)
+
+    def put_many(raws, replace=False):
+        for raw in raws:
+            if blobs.key(raw) != failed:
+                blobs.put(raw, replace)
+        error = {"create": {"_id": failed, "status": 500, "error": "failed"}}
+        raise BulkIndexError("1 blob(s) failed.", [error])
+
+    monkeypatch.setattr(blobs, "put_many", put_many)
+    results = dict(SmartAPI.save_many(smartapis))
+    assert results[smartapis[0]._id] is None
+    assert isinstance(results[smartapis[1]._id], ControllerError)
+
+    refresh()
+    assert SmartAPI.get(smartapis[0]._id).raw == smartapis[0].raw
+    assert not SmartAPI.exists(smartapis[1]._id)
 
 
 @pytest.fixture
@@ -338,6 +504,86 @@ def test_uptime_status():
     assert mygene_doc._status.uptime_status is None
 
 
+def test_partial_update():
+    mygene = SmartAPI.get(MYGENE_ID, meta_only=True)
+    mygene.uptime.update('partial')
+    mygene.save()  # without the content
+    assert mygene._deferred
+    refresh()
+    mygene_doc = APIDoc.get(MYGENE_ID)
+    assert mygene_doc._status.uptime_status == 'partial'
+    assert decoder.decompress(mygene_doc._raw) == MYGENE_RAW
+
+    mygene = SmartAPI.get(MYGENE_ID)
+    mygene.raw = MYGENE_RAW  # same content
+    mygene.uptime.update(None)
+    mygene.save()
+    refresh()
+    mygene_doc = APIDoc.get(MYGENE_ID)
+    assert mygene_doc._status.uptime_status is None
+    assert mygene_doc._meta.last_updated == mygene.last_updated
+
+    with pytest.raises(NotFoundError):
+        notexist = SmartAPI.get(MYGENE_ID, meta_only=True)
+        notexist._url = "http://example.com/notexist.json"
+        notexist.slug = None
+        notexist.save()
+
+
+def test_async(myvariant):
+    """
+    await SmartAPI.get_async(client, _id)
+    await smartapi.save_async(client)
+    await smartapi.delete_async(client)
+    ...
+    """
+    async def main():
+        client = AsyncElasticsearch(hosts=ES_HOST)
+        try:
+            await operations(client)
+        finally:
+            await client.transport.close()
+
+    async def operations(client):
+        assert await SmartAPI.exists_async(client, MYGENE_ID)
+        assert not await SmartAPI.exists_async(client, "NOTEXIST")
+        assert await SmartAPI.find_async(client, "mygene") == MYGENE_ID
+        assert await SmartAPI.find_async(client, MYGENE_URL, "url") == MYGENE_ID
+        assert await SmartAPI.find_async(client, "tester", "username")
+
+        mygene = await SmartAPI.get_async(client, MYGENE_ID, meta_only=True)
+        assert mygene._deferred
+        await mygene.fetch_async(client)
+        assert mygene.raw == MYGENE_RAW
+
+        mygene.uptime.update('async')
+        await mygene.save_async(client, reindex=True)
+        refresh()
+        mygene_doc = APIDoc.get(MYGENE_ID)
+        assert mygene_doc._status.uptime_status == 'async'
+        assert await blobs.get_async(client, mygene_doc._blob) == MYGENE_RAW
+        assert mygene_doc._raw is None
+
+        mygene = await SmartAPI.get_async(client, MYGENE_ID, meta_only=True)
+        mygene.uptime.update(None)
+        await mygene.save_async(client)  # without the content
+        refresh()
+        mygene_doc = APIDoc.get(MYGENE_ID)
+        assert mygene_doc._status.uptime_status is None
+
+        mv = await SmartAPI.get_async(client, myvariant)
+        await mv.delete_async(client)
+        refresh()
+        assert not APIDoc.exists(myvariant)
+
+        with pytest.raises(NotFoundError):
+            await SmartAPI.get_async(client, myvariant)
+        with pytest.raises(NotFoundError):
+            await mv.delete_async(client)
+
+    asyncio.get_event_loop().run_until_complete(main())
+
+
 def test_uptime_update():
 
     mygene = SmartAPI.get(MYGENE_ID)
@@ -433,6 +679,35 @@ def test_refresh_status():
     assert mygene_doc._status.refresh_status == 499
     assert 'components' in mygene_doc
 
+    _date = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    mygene.webdoc.update(File(200, MYGENE_FULL, "0xETAG", _date))  # validators
+
+    assert mygene.webdoc.status == 200
+    assert mygene.webdoc.headers == {
+        'If-None-Match': '"0xETAG"',
+        'If-Modified-Since': 'Fri, 01 Jan 2021 00:00:00 GMT'
+    }
+
+    mygene.save()
+    refresh()
+
+    mygene = SmartAPI.get(MYGENE_ID)
+    assert mygene.webdoc.etag == "0xETAG"
+    assert mygene.webdoc.date == _date
+
+    mygene.webdoc.update(File(304, None, None, None))  # conditional request
+
+    assert mygene.webdoc.status == 200  # not modified
+    assert mygene._deferred  # not loaded
+    assert mygene.webdoc.etag == "0xETAG"
+
+    digest = blobs.key(MYGENE_FULL)  # same content, as downloaded
+    mygene.webdoc.update(File(200, MYGENE_FULL, "0xETAG2", None, digest))
+
+    assert mygene.webdoc.status == 200  # not modified
+    assert mygene._deferred  # not decoded
+    assert mygene.webdoc.etag == "0xETAG2"
+
 
 def test_refresh_update():
 
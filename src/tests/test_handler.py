@@ -32,8 +32,10 @@ import pytest
 import tornado
 import yaml
 from biothings.tests.web import BiothingsTestCase
-from controller import NotFoundError, SmartAPI
+from controller import NotFoundError, SmartAPI, aggregations, writes
+from handlers import SmartAPIReadOnlyHandler, ValidateHandler
 from model import APIDoc
+from pipeline import documents
 from tornado.escape import json_encode
 from tornado.web import create_signed_value
 from utils import decoder
@@ -166,6 +168,54 @@ class TestValidate(SmartAPIEndpoint):
         with open(os.path.join(dirname, './validate/x-translator-fail-2.yml'), 'rb') as file:
             self.request("/api/validate/", method='POST', data=file.read(), expect=400)
 
+    def test_cached(self):
+        '''
+        [POST] same content validated once
+        '''
+        with open(os.path.join(dirname, './validate/openapi-pass.json'), 'rb') as file:
+            raw = file.read()
+        self.request("/api/validate/", method='POST', data=raw)
+        hits = ValidateHandler.verdicts.hits
+        self.request("/api/validate/", method='POST', data=raw)
+        assert ValidateHandler.verdicts.hits == hits + 1
+        with open(os.path.join(dirname, './validate/x-translator-fail-1.yml'), 'rb') as file:
+            raw = file.read()
+        self.request("/api/validate/", method='POST', data=raw, expect=400)
+        self.request("/api/validate/", method='POST', data=raw, expect=400)
+        assert ValidateHandler.verdicts.hits == hits + 2
+
+        res = self.request("/api/stats").json()
+        assert res["caches"]["verdicts"]["hits"] == hits + 2
+        assert "documents" in res["caches"]
+
+    def test_batch(self):
+        '''
+        [POST] with a list of documents and urls
+        '''
+        with open(os.path.join(dirname, './validate/x-translator-fail-1.yml'), 'rb') as file:
+            invalid = decoder.to_dict(file.read())
+        res = self.request("/api/validate/", method='POST', json=[
+            decoder.to_dict(MYGENE_RAW), invalid,
+            "http://invalidhost.invalid/api.yml", 1,
+            "ftp://localhost/api.yml", "notaurl",
+            decoder.to_dict(MYGENE_RAW)
+        ])
+        assert res.headers['Content-Type'] == 'application/x-ndjson'
+        results = [json.loads(line) for line in res.text.splitlines()]
+        results = {result['index']: result for result in results}
+        assert len(results) == 7  # not interrupted
+        assert results[0]['success']
+        assert not results[1]['success']
+        assert not results[2]['success']
+        assert results[2]['url'] == "http://invalidhost.invalid/api.yml"
+        assert not results[3]['success']
+        assert not results[4]['success']  # unsupported scheme
+        assert results[4]['url'] == "ftp://localhost/api.yml"
+        assert not results[5]['success']
+        assert all(result['details'] for result in results.values())
+        assert results[6]['success']
+        self.request("/api/validate/", method='POST', json=[], expect=400)
+
 
 class TestSuggestion(SmartAPIEndpoint):
 
@@ -180,6 +230,36 @@ class TestSuggestion(SmartAPIEndpoint):
         assert "translator" in res
         assert res["translator"] == 2
 
+    def test_suggestion_cached(self):
+        '''
+        [GET] aggregations are reused until a write
+        '''
+        self.request("/api/suggestion?field=tags.name")
+        hits = aggregations._cache.hits
+        self.request("/api/suggestion?field=tags.name")
+        assert aggregations._cache.hits == hits + 1
+        writes.record()
+        res = self.request("/api/suggestion?field=tags.name").json()
+        assert res["annotation"] == 2
+
+
+class TestSuggest(SmartAPIEndpoint):
+
+    def test_suggest(self):
+        '''
+        [GET] autocomplete a prefix
+        '''
+        self.request("/api/suggest", expect=400)
+        res = self.request("/api/suggest?q=myg").json()
+        assert {"field": "info.title", "text": "MyGene.info API", "_id": MYGENE_ID} in res
+        assert {"field": "_meta.slug", "text": "mygene", "_id": MYGENE_ID} in res
+        res = self.request("/api/suggest?q=transl").json()
+        assert [item["text"] for item in res] == ["translator"]
+        res = self.request("/api/suggest?q=my&size=1").json()
+        assert len(res) == 1
+        res = self.request("/api/suggest?q=notexist").json()
+        assert res == []
+
 
 class DynamicFileHandler(tornado.web.StaticFileHandler):
 
@@ -224,6 +304,39 @@ class TestCRUD(SmartAPIEndpoint):
         res = self.request("/api/metadata/" + MYGENE_ID + "?format=yaml")
         yaml.load(res.text, Loader=yaml.SafeLoader)
 
+    def test_get_one_cached(self):
+
+        self.request("/api/metadata/" + MYGENE_ID + "?raw=1")
+        SmartAPIReadOnlyHandler.responses.clear()
+        hits = documents.hits
+        res = self.request("/api/metadata/" + MYGENE_ID + "?raw=1").json()
+        assert documents.hits == hits + 1
+        assert res['info']['title'] == "MyGene.info API"
+        assert '_meta' in res
+
+    def test_get_one_etag(self):
+
+        res = self.request("/api/metadata/" + MYGENE_ID)
+        etag = res.headers['ETag']
+        hits = SmartAPIReadOnlyHandler.responses.hits
+        res = self.request("/api/metadata/" + MYGENE_ID)
+        assert res.headers['ETag'] == etag
+        assert SmartAPIReadOnlyHandler.responses.hits == hits + 1
+        assert res.json()['info']['title'] == "MyGene.info API"
+
+        self.request(
+            "/api/metadata/" + MYGENE_ID, expect=304,
+            headers={'If-None-Match': etag})
+
+        res = self.request("/api/metadata/" + MYGENE_ID + "?format=yaml")
+        assert res.headers['ETag'] != etag
+        assert res.headers['Content-Type'].startswith('text/x-yaml')
+
+        writes.record()  # invalidates the responses
+        self.request(
+            "/api/metadata/" + MYGENE_ID,
+            headers={'If-None-Match': etag}, expect=304)
+
     def test_get_all(self):
 
         res = self.request("/api/metadata/", method='GET').json()
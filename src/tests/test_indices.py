@@ -0,0 +1,140 @@
+"""
+Elasticsearch Index Setup Tests
+"""
+import json
+import os
+
+import pytest
+from elasticsearch import Elasticsearch
+from elasticsearch_dsl import Index
+
+from model import APIBlob, APIDoc
+from utils import decoder
+from utils.indices import compatible, refresh, reset, setup
+
+client = Elasticsearch()
+dirname = os.path.dirname(__file__)
+
+with open(os.path.join(dirname, '../utils/mapping.json'), 'r') as file:
+    MAPPING = json.load(file)
+
+with open(os.path.join(dirname, 'mygene.es.json'), 'r') as file:
+    MYGENE = json.load(file)
+    MYGENE.pop("_id")
+
+with open(os.path.join(dirname, 'mygene.yml'), 'rb') as file:
+    MYGENE_RAW = file.read()
+
+
+TEXT = {"type": "text", "fields": {"raw": {"type": "keyword"}}}
+
+# the mapping of an index created before utils/mapping.json
+# flattened operations and disabled the other spec trees,
+# with the fields the documents added dynamically.
+LEGACY = {
+    "_meta": {"properties": {
+        "url": {"type": "keyword"},
+        "slug": {"type": "keyword"},
+        "username": {"type": "keyword"},
+        "date_created": {"type": "date"},
+        "last_updated": {"type": "date"}
+    }},
+    "_raw": {"type": "binary"},
+    "components": {"enabled": False},
+    "definitions": {"enabled": False},
+    "info": {"properties": {
+        "title": TEXT,
+        "description": TEXT,
+        "contact": {"properties": {"name": TEXT}}
+    }},
+    "tags": {"properties": {"name": TEXT}},
+    "paths": {"properties": {
+        "path": {"type": "text"},
+        "pathitem": {"properties": {"get": {"properties": {"summary": TEXT}}}}
+    }},
+    "parameters": {"properties": {"geneid": {"properties": {"name": TEXT}}}},
+    "responses": {"properties": {"notfound": {"properties": {"description": TEXT}}}},
+    "securityDefinitions": {"properties": {"api_key": {"properties": {"type": TEXT}}}},
+    "security": {"properties": {"api_key": TEXT}},
+    "openapi": {"type": "text"}
+}
+
+
+def test_compatible():
+    properties, conflicts = compatible(MAPPING['properties'], LEGACY)
+    assert sorted(conflicts) == [
+        'parameters', 'paths.pathitem', 'responses',
+        'security', 'securityDefinitions'
+    ]
+    assert properties['info']['properties']['title']['fields']['prefix']
+    assert properties['info']['properties']['description']['fields']['prefix']
+    assert properties['tags']['properties']['name']['fields']['suggest']
+    assert 'pathitem' not in properties['paths']['properties']
+    assert 'security' not in properties
+    assert compatible(MAPPING['properties'], {}) == (MAPPING['properties'], [])
+
+    # as returned by elasticsearch once put
+    assert compatible(MAPPING['properties'], MAPPING['properties'])[1] == []
+    _, conflicts = compatible(
+        {"raw": {"type": "keyword", "index": False}},
+        {"raw": {"type": "keyword"}})
+    assert conflicts == ['raw']
+
+
+def test_setup_existing():
+    index = Index(APIDoc.Index.name)
+    index.delete(ignore=404)
+    try:
+        index.settings(**APIDoc.Index.settings)
+        index.create()
+        client.indices.put_mapping(index=APIDoc.Index.name, body={"properties": LEGACY})
+        client.index(APIDoc.Index.name, MYGENE, id="doc1")
+        refresh()
+
+        setup()  # without raising
+        refresh()
+
+        mapping = client.indices.get_mapping(index=APIDoc.Index.name)
+        properties = mapping[APIDoc.Index.name]['mappings']['properties']
+        assert 'prefix' in properties['info']['properties']['title']['fields']
+        assert 'prefix' in properties['info']['properties']['description']['fields']
+        assert 'suggest' in properties['tags']['properties']['name']['fields']
+        assert 'suggest' in properties['_meta']['properties']['slug']['fields']
+        assert properties['paths']['properties']['pathitem'].get('type', 'object') == 'object'
+        assert properties['security'].get('enabled', True)  # left as it is
+
+        # existing documents are indexed in the new subfields
+        assert APIDoc.exists('myge', 'info.title.prefix')
+    finally:
+        reset()
+
+
+def test_remap_dictionary(tmp_path, monkeypatch):
+    pytest.importorskip("zstandard")
+    # downloads the schemas on import
+    import admin  # pylint: disable=import-outside-toplevel
+    from controller import SmartAPI, blobs  # pylint: disable=import-outside-toplevel
+
+    compression = decoder.Compression()
+    compression.load(blobs)
+    monkeypatch.setattr(decoder, "compression", compression)
+    reset()
+    try:
+        smartapi = SmartAPI("http://example.com/mygene.yml")
+        smartapi.raw = MYGENE_RAW
+        smartapi.username = "tester"
+        smartapi.save()
+        refresh()
+
+        samples = [MYGENE_RAW[i:i + 512] for i in range(0, len(MYGENE_RAW), 512)]
+        dictionary = compression.train(samples, size=4096)
+        admin.remap(str(tmp_path / "backup.json"))
+
+        # in a process started after the remap
+        data = APIBlob.get(smartapi._blob).data
+        assert decoder.zstandard.get_frame_parameters(data).dict_id == dictionary.dict_id()
+        restarted = decoder.Compression()
+        restarted.load(blobs)
+        assert restarted.decompress(data) == MYGENE_RAW
+    finally:
+        reset()
@@ -8,7 +8,7 @@ import pytest
 from elasticsearch import Elasticsearch
 
 from model import APIDoc
-from utils.indices import refresh
+from utils.indices import refresh, stats
 
 client = Elasticsearch()
 dirname = os.path.dirname(__file__)
@@ -47,6 +47,14 @@ def test_exists():
     assert APIDoc.exists('mygene.info', 'info.description')
 
 
+def test_resolve():
+    assert APIDoc.resolve('mygene') == 'doc1'
+    assert APIDoc.resolve('mygene.info') is None
+    assert APIDoc.resolve('tester', '_meta.username') == 'doc1'
+    assert APIDoc.resolve_many(['mygene', 'mychem']) == {'mygene': 'doc1', 'mychem': None}
+    assert APIDoc.resolve_many([]) == {}
+
+
 def test_aggregation():
     assert 'Chunlei Wu' in APIDoc.aggregate('info.contact.name')
     assert 'gene' in APIDoc.aggregate()
@@ -58,5 +66,19 @@ def test_aggregation():
     assert 'mygene' in APIDoc.aggregate('_meta.slug')
 
 
+def test_mapping():
+    # operations are indexed as keywords in one field
+    summary = "Make gene query and return matching gene hits"
+    assert APIDoc.exists(summary, 'paths.pathitem')
+    assert APIDoc.exists(summary, 'paths.pathitem.get.summary')
+    assert not APIDoc.exists('gene', 'paths.pathitem.get.summary')
+    # and their summaries and descriptions as text
+    assert APIDoc.exists('gene', 'paths.operations')
+    mapping = client.indices.get_mapping(index=ES_INDEX_NAME)
+    mapping = mapping[ES_INDEX_NAME]['mappings']['properties']['paths']
+    assert mapping['properties']['pathitem']['type'] == 'flattened'
+    assert 0 < stats()['fields'] < 500
+
+
 def teardown_module():
     client.delete(ES_INDEX_NAME, "doc1", ignore=404)
@@ -72,6 +72,16 @@ class SmartAPIQueryTest(BiothingsTestCase):
         res = self.query(q='tags.name:gene')
         assert res['total'] == 1
 
+    def test_query_prefix(self):
+
+        # word prefixes, as users type
+        res = self.query(q='myge')
+        assert res['hits'][0]['_id'] == MYGENE_ID
+        res = self.query(q='MyChe')
+        assert res['hits'][0]['_id'] == MYCHEM_ID
+        res = self.query(q='mychemical', hits=False)
+        assert res['total'] == 0
+
     def test_query_filters(self):
         res = self.query(authors='"Chunlei Wu"')
         assert res['total'] == 2
@@ -2,7 +2,7 @@ import os
 
 import pytest
 
-from controller import openapis, swaggers, validate
+from controller import openapis, swaggers, validate, validators
 
 dirname = os.path.dirname(__file__)
 
@@ -51,3 +51,12 @@ def test_05():
         validate(PASS_SWAGGER, openapis)
     with pytest.raises(ValueError):
         validate(PASS_OPENAPI, swaggers)
+
+
+def test_06():
+    assert validators.get(openapis["openapi_v3"]) is validators.get(openapis["openapi_v3"])
+    assert validators.get(openapis["openapi_v3"]) is not validators.get(swaggers["swagger_v2"])
+    validate(PASS_OPENAPI, openapis)
+    validate(PASS_OPENAPI, openapis)  # compiled validators reused
+    with pytest.raises(ValueError):
+        validate(FAIL_TRANSLATOR_1, openapis)
@@ -0,0 +1,269 @@
+"""
+    Raw Document Stores
+
+    Content-addressed storage of the original documents,
+    out of the search index, so that its _source is small.
+    Identical contents are stored once, under the same key.
+
+    store = IndexStore()  # in a side elasticsearch index
+    store = FileStore(path)  # in a local directory
+
+    key = store.put(raw)
+    raw = store.get(key)
+
+    # compress again, see decoder.Compression
+    key = store.put(raw, replace=True)
+
+    # zstd dictionaries, by their ids
+    store.put_dictionary(dict_id, data)
+    dictionaries = store.get_dictionaries()
+
+"""
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from base64 import b64decode, b64encode
+from datetime import datetime, timezone
+from hashlib import blake2b
+
+from elasticsearch.exceptions import ConflictError, NotFoundError
+from elasticsearch.helpers import BulkIndexError, bulk
+
+from model import APIBlob
+from utils import decoder
+
+
+class BlobStore(ABC):
+    """
+        Store bytes by the hash of their content.
+        Existing contents are kept unless replace is set.
+        Get raises KeyError if there's no such key.
+        Async methods take an async elasticsearch
+        client, stores without a database ignore it.
+    """
+
+    @staticmethod
+    def key(raw):
+        return blake2b(raw, digest_size=32).hexdigest()
+
+    @abstractmethod
+    def put(self, raw, replace=False):
+        """
+        Store a content, return its key.
+        """
+
+    def put_many(self, raws, replace=False):
+        return [self.put(raw, replace) for raw in raws]
+
+    @abstractmethod
+    def get(self, key):
+        """
+        Return the content of a key.
+        """
+
+    def get_many(self, keys):
+        """
+        Return a dict of the keys found and their contents.
+        """
+        result = {}
+        for key in keys:
+            try:
+                result[key] = self.get(key)
+            except KeyError:
+                pass
+        return result
+
+    async def put_async(self, client, raw, replace=False):
+        return self.put(raw, replace)
+
+    async def get_async(self, client, key):
+        return self.get(key)
+
+    async def get_many_async(self, client, keys):
+        """
+        Return a dict of the keys found and their contents.
+        """
+        result = {}
+        for key in keys:
+            try:
+                result[key] = await self.get_async(client, key)
+            except KeyError:
+                pass
+        return result
+
+    @abstractmethod
+    def put_dictionary(self, dict_id, data):
+        """
+        Store a compression dictionary, uncompressed.
+        """
+
+    @abstractmethod
+    def get_dictionaries(self):
+        """
+        Return the compression dictionaries, oldest first.
+        """
+
+
+class IndexStore(BlobStore):
+    """
+        Store in an elasticsearch index, see model.APIBlob.
+        Dictionaries are documents with a trained date,
+        under ids that are not content hashes.
+    """
+
+    def put(self, raw, replace=False):
+        key = self.key(raw)
+        try:
+            APIBlob(
+                meta={'id': key},
+                data=decoder.compress(raw)
+            ).save(op_type='index' if replace else 'create')
+        except ConflictError:
+            pass  # already stored
+        return key
+
+    def put_many(self, raws, replace=False):
+        keys, actions = [], {}
+        for raw in raws:
+            key = self.key(raw)
+            keys.append(key)
+            actions[key] = {
+                "_op_type": "index" if replace else "create",
+                "_index": APIBlob.Index.name,
+                "_id": key,
+                "data": b64encode(decoder.compress(raw)).decode()
+            }
+        _, errors = bulk(
+            APIBlob._get_connection(), actions.values(),
+            raise_on_error=False, raise_on_exception=False)
+        errors = [
+            error for error in errors  # not already stored
+            if next(iter(error.values())).get('status') != 409
+        ]
+        if errors:
+            raise BulkIndexError(f"{len(errors)} blob(s) failed.", errors)
+        return keys
+
+    def get(self, key):
+        try:
+            blob = APIBlob.get(key)
+        except NotFoundError as err:
+            raise KeyError(key) from err
+        return decoder.decompress(blob.data)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        response = APIBlob._get_connection().mget(
+            index=APIBlob.Index.name, body={"ids": keys})
+        return {
+            doc['_id']: decoder.decompress(b64decode(doc['_source']['data']))
+            for doc in response['docs'] if doc.get('found')
+        }
+
+    async def put_async(self, client, raw, replace=False):
+        key = self.key(raw)
+        body = {"data": b64encode(decoder.compress(raw)).decode()}
+        try:
+            if replace:
+                await client.index(index=APIBlob.Index.name, id=key, body=body)
+            else:
+                await client.create(index=APIBlob.Index.name, id=key, body=body)
+        except ConflictError:
+            pass  # already stored
+        return key
+
+    async def get_async(self, client, key):
+        try:
+            response = await client.get(index=APIBlob.Index.name, id=key)
+        except NotFoundError as err:
+            raise KeyError(key) from err
+        return decoder.decompress(b64decode(response['_source']['data']))
+
+    async def get_many_async(self, client, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        response = await client.mget(
+            index=APIBlob.Index.name, body={"ids": keys})
+        return {
+            doc['_id']: decoder.decompress(b64decode(doc['_source']['data']))
+            for doc in response['docs'] if doc.get('found')
+        }
+
+    def put_dictionary(self, dict_id, data):
+        APIBlob(
+            meta={'id': f'zdict-{dict_id}'},
+            data=data, trained=datetime.now(timezone.utc)
+        ).save(refresh=True)  # for the other processes
+
+    def get_dictionaries(self):
+        search = APIBlob.search() \
+            .filter('exists', field='trained') \
+            .sort({'trained': {'unmapped_type': 'date'}})
+        return [blob.data for blob in search[:1000]]
+
+
+class FileStore(BlobStore):
+    """
+        Store in a local directory, shared by the
+        processes of the application, as files
+        named by their keys, in subdirectories
+        named by the first two characters.
+        Dictionaries are files named by their
+        ids in the "zdict" subdirectory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _path(self, key):
+        # compressed by decoder.compress, in any
+        # of its formats, so without a suffix.
+        return os.path.join(self.path, key[:2], key)
+
+    @staticmethod
+    def _write(path, data):
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        # readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=dirname, prefix='.')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def put(self, raw, replace=False):
+        key = self.key(raw)
+        path = self._path(key)
+        if replace or not os.path.exists(path):
+            self._write(path, decoder.compress(raw))
+        return key
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as file:
+                return decoder.decompress(file.read())
+        except FileNotFoundError as err:
+            raise KeyError(key) from err
+
+    def put_dictionary(self, dict_id, data):
+        self._write(os.path.join(self.path, 'zdict', str(dict_id)), data)
+
+    def get_dictionaries(self):
+        dirname = os.path.join(self.path, 'zdict')
+        if not os.path.isdir(dirname):
+            return []
+        paths = sorted((
+            os.path.join(dirname, name)
+            for name in os.listdir(dirname) if name.isdigit()
+        ), key=os.path.getmtime)
+        dictionaries = []
+        for path in paths:
+            with open(path, 'rb') as file:
+                dictionaries.append(file.read())
+        return dictionaries
@@ -0,0 +1,117 @@
+"""
+    In-Process Caches
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache():
+    """
+        Least recently used cache.
+        Entries optionally expire after ttl seconds.
+        Optionally bounded by the total size of entries,
+        as given by the callers when setting them.
+        Count hits and misses for monitoring.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._data = OrderedDict()  # key: (expiration, value, size)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] is not None and entry[0] < time.monotonic():
+                self._remove(key)  # expired
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None, size=0):
+        if self.maxbytes is not None and size > self.maxbytes:
+            self.pop(key)  # would evict everything else
+            return
+        ttl = ttl if ttl is not None else self.ttl
+        expiration = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expiration, value, size)
+            self.bytes += size
+            while len(self._data) > self.maxsize or \
+                    self.maxbytes is not None and self.bytes > self.maxbytes:
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key):
+        _, value, size = self._data.pop(key)
+        self.bytes -= size
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                return self._remove(key)
+        return default
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def __contains__(self, key):
+        # without counting a hit or miss
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None:
+            return False
+        return entry[0] is None or entry[0] >= time.monotonic()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight():
+    """
+        Coalesce concurrent calls of a coroutine function
+        with the same key, on an event loop, so that the
+        callers arriving while one is in progress share its
+        result or exception instead of making their own.
+    """
+
+    def __init__(self):
+        self._futures = {}  # key: future, in progress
+
+    async def run(self, key, func, *args):
+        future = self._futures.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func(*args))
+            self._futures[key] = future
+            future.add_done_callback(lambda _: self._futures.pop(key, None))
+        # a cancelled caller doesn't cancel the others
+        return await asyncio.shield(future)
+
+    def __len__(self):
+        return len(self._futures)
@@ -2,19 +2,35 @@
 
 import gzip
 import json
+import threading
+from collections import Counter
 
 import yaml
 
+try:  # optional, see Compression
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:  # libyaml bindings
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # pure python
+    from yaml import SafeLoader
+
 # -------------
 #  Conversion
 # -------------
 
 TYPE_ERR = "Expect a serialization of a mapping type."
 
+# number of documents decoded by to_dict,
+# by the decoder used: "json" or "yaml".
+usage = Counter()
+
 
 def to_yaml(stream):
     try:
-        data = yaml.load(stream, Loader=yaml.SafeLoader)
+        data = yaml.load(stream, Loader=SafeLoader)
     except (
         yaml.scanner.ScannerError,
         yaml.parser.ParserError
@@ -35,6 +51,33 @@ def to_json(stream):
     return data
 
 
+def sniff(stream):
+    """
+    Guess the format of a string or bytes.
+    Return "json" if it looks like a JSON object,
+    otherwise "yaml", which is a superset of JSON.
+    """
+    if isinstance(stream, bytes):
+        head = stream[:64].lstrip(b'\xef\xbb\xbf \t\r\n')[:1]
+        return 'json' if head == b'{' else 'yaml'
+    if isinstance(stream, str):
+        head = stream[:64].lstrip('\ufeff \t\r\n')[:1]
+        return 'json' if head == '{' else 'yaml'
+    return 'yaml'
+
+
+def _to_json(stream):
+    data = to_json(stream)
+    usage['json'] += 1
+    return data
+
+
+def _to_yaml(stream):
+    data = to_yaml(stream)
+    usage['yaml'] += 1
+    return data
+
+
 def to_dict(stream, ext=None, ctype=None):
     """
     Load a string or bytes to a dict.
@@ -47,15 +90,15 @@ def to_dict(stream, ext=None, ctype=None):
 
     # by extension
     if 'json' in ext:
-        return to_json(stream)
+        return _to_json(stream)
     if ext in ('yaml', 'yml'):
-        return to_yaml(stream)
+        return _to_yaml(stream)
 
     # by content-type
     if 'json' in ctype:
-        return to_json(stream)
+        return _to_json(stream)
     if 'yaml' in ctype:
-        return to_yaml(stream)
+        return _to_yaml(stream)
 
     # javascript files
     if isinstance(stream, bytes):
@@ -67,17 +110,142 @@ def to_dict(stream, ext=None, ctype=None):
         if stream.startswith("export default "):
             stream = stream[len("export default "):]
 
+    # json is much faster to parse,
+    # try it first when it looks so.
+    if sniff(stream) == 'json':
+        try:
+            return _to_json(stream)
+        except ValueError:
+            pass  # like a yaml flow mapping
+
     # brute force
-    return to_yaml(stream)
+    return _to_yaml(stream)
 
 
 # -------------
 # Compression
 # -------------
 
+# the format of compressed data is identified by
+# its magic bytes, and in zstd frames, the id of
+# the dictionary it's compressed with, if any.
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+class Compression():
+    """
+        Compress with zstd, using the newest dictionary
+        loaded or trained, or with gzip if zstandard is
+        not installed. Decompress any of these formats.
+
+        Dictionaries are kept in a store, with the data
+        compressed with them, see utils.blobs. Data
+        compressed with a dictionary can only be
+        decompressed with it, keep them around.
+    """
+
+    def __init__(self, level=10):
+        self.level = level
+        self.store = None
+        self.dictionaries = {}  # id: ZstdCompressionDict
+        self.dictionary = None  # to compress with
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def load(self, store):
+        """
+        Use the dictionaries of a store, loaded on first
+        use. Those added later, by other processes, are
+        loaded when data compressed with them is read.
+        """
+        self.store = store
+        self._loaded = False
+
+    def _load(self):
+        with self._lock:
+            for data in self.store.get_dictionaries():  # oldest first
+                self._add(zstandard.ZstdCompressionDict(data))
+            self._loaded = True
+
+    def save(self):
+        """
+        Save the dictionaries in memory to the store,
+        the one compressed with last, for example after
+        the store is emptied and the data is written again.
+        """
+        for dict_id, dictionary in list(self.dictionaries.items()):
+            if dictionary is not self.dictionary:
+                self.store.put_dictionary(dict_id, dictionary.as_bytes())
+        if self.dictionary:
+            self.store.put_dictionary(
+                self.dictionary.dict_id(), self.dictionary.as_bytes())
+
+    def _ensure_loaded(self):
+        if self.store and not self._loaded:
+            self._load()
+
+    def train(self, samples, size=112640):
+        """
+        Train a dictionary on sample documents,
+        compress with it from now on and save it
+        to the store loaded, if there's one.
+        """
+        self._ensure_loaded()
+        dictionary = zstandard.train_dictionary(size, list(samples))
+        if self.store:
+            self.store.put_dictionary(dictionary.dict_id(), dictionary.as_bytes())
+        self._add(dictionary)
+        return dictionary
+
+    def _add(self, dictionary):
+        self.dictionaries[dictionary.dict_id()] = dictionary
+        self.dictionary = dictionary
+
+    def _compressor(self):
+        # not safe to share between threads
+        dict_id = self.dictionary.dict_id() if self.dictionary else 0
+        compressors = self._local.__dict__.setdefault('compressors', {})
+        if dict_id not in compressors:
+            compressors[dict_id] = zstandard.ZstdCompressor(
+                level=self.level, dict_data=self.dictionary)
+        return compressors[dict_id]
+
+    def _decompressor(self, dict_id):
+        decompressors = self._local.__dict__.setdefault('decompressors', {})
+        if dict_id not in decompressors:
+            if dict_id and dict_id not in self.dictionaries and self.store:
+                self._load()  # trained by another process
+            if dict_id and dict_id not in self.dictionaries:
+                raise ValueError(f"Unknown zstd dictionary {dict_id}.")
+            decompressors[dict_id] = zstandard.ZstdDecompressor(
+                dict_data=self.dictionaries.get(dict_id))
+        return decompressors[dict_id]
+
+    def compress(self, stream):
+        if not zstandard:
+            return gzip.compress(stream)
+        self._ensure_loaded()
+        return self._compressor().compress(stream)
+
+    def decompress(self, stream):
+        if stream.startswith(ZSTD_MAGIC):
+            if not zstandard:
+                raise ValueError("Install zstandard to decompress.")
+            dict_id = zstandard.get_frame_parameters(stream).dict_id
+            return self._decompressor(dict_id).decompress(stream)
+        if stream.startswith(GZIP_MAGIC):
+            return gzip.decompress(stream)  # before zstd
+        raise ValueError("Unknown compression format.")
+
+
+compression = Compression()
+
+
 def compress(stream):
-    return gzip.compress(stream) if stream else None
+    return compression.compress(stream) if stream else None
 
 
 def decompress(stream):
-    return gzip.decompress(stream) if stream else None
+    return compression.decompress(stream) if stream else None
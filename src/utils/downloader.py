@@ -1,8 +1,15 @@
+import json
+import logging
+import os
+import tempfile
 from abc import ABC, abstractmethod
 from collections import UserDict, namedtuple
 from collections.abc import Iterable, Mapping
-from datetime import timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import format_datetime
 from email.utils import parsedate_to_datetime as parsedt
+from hashlib import blake2b
 from itertools import repeat
 from urllib.parse import urlparse
 
@@ -11,6 +18,9 @@ import requests
 from tornado import httpclient
 
 from utils import decoder
+from utils.sessions import session
+
+logger = logging.getLogger(__name__)
 
 # TODO should capture ERR_CONNECTION_TIMED_OUT message
 
@@ -24,7 +34,13 @@ File = namedtuple("File", (
     "raw",  # response body as bytes
     "etag",  # stripped ETag hash in header
     "date",  # response time in header
-))
+    "digest",  # content hash, same as utils.blobs keys
+    "modified",  # Last-Modified time in header
+), defaults=(None, None))
+
+# the largest response body accepted, bytes.
+# larger responses are aborted while receiving.
+MAX_SIZE = int(os.getenv('DOWNLOAD_MAX_SIZE', 16 * 1024 ** 2))
 
 # PYTHON 3.7 - MARK A
 # File = namedtuple("File", (
@@ -84,6 +100,14 @@ class ResponseParser(ABC):
         except TypeError:
             return None
 
+    def get_modified(self):
+        _ts = self._response.headers.get('Last-Modified')
+
+        try:
+            return parsedt(_ts).replace(tzinfo=timezone.utc)
+        except (TypeError, ValueError):
+            return None
+
 
 class RequestsParser(ResponseParser):
 
@@ -115,15 +139,85 @@ class TornadoParser(ResponseParser):
         return self._response.body
 
 
+def conditional_headers(etag=None, date=None):
+    """
+    Request headers to download a file only if it has changed
+    since a previous response, with its ETag and Last-Modified
+    headers, see last_modified. A 304 status is returned
+    otherwise, without content.
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = f'"{etag}"'
+    if date:
+        headers['If-Modified-Since'] = format_datetime(date, usegmt=True)
+    return headers
+
+
+def last_modified(file):
+    """
+    The time to revalidate a file with, its Last-Modified
+    header, or the response Date if the server sent none,
+    only accurate when the file changes between responses.
+    """
+    return file.modified or file.date
+
+
+class ResponseBody():
+    """
+        Response body received in chunks, aborted
+        when it exceeds the size limit, and hashed
+        incrementally, so that unchanged content can
+        be recognized without decoding it.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self.exceeded = False
+        self._hash = blake2b(digest_size=32)
+        self._chunks = []
+        self._size = 0
+
+    def write(self, chunk):
+        self._size += len(chunk)
+        if self.max_size and self._size > self.max_size:
+            self.exceeded = True
+            raise DownloadError(f"Response exceeds {self.max_size} bytes.")
+        self._hash.update(chunk)
+        self._chunks.append(chunk)
+
+    @property
+    def raw(self):
+        return b''.join(self._chunks)
+
+    @property
+    def digest(self):
+        return self._hash.hexdigest()
+
+
+def _too_large(body, raise_error):
+    if raise_error:
+        raise DownloadError(f"Response exceeds {body.max_size} bytes.")
+    return File(413, None, None, None)  # payload too large
+
+
 # TODO REQUIRE ADDITIONAL TESTING TO UNDERSTAND ERROR TYPES
 
 
-def download(url, timeout=5, raise_error=True):
+def download(url, timeout=5, raise_error=True, headers=None, max_size=MAX_SIZE):
+    body = ResponseBody(max_size)
     try:
-        response = requests.get(url, timeout=timeout)
-        if raise_error:
-            response.raise_for_status()
-        result = RequestsParser(response)
+        with session.get(url, timeout=timeout, headers=headers, stream=True) as response:
+            if raise_error:
+                response.raise_for_status()
+            result = RequestsParser(response)
+            length = response.headers.get('Content-Length', '')
+            if max_size and length.isdigit() and int(length) > max_size:
+                return _too_large(body, raise_error)  # before receiving
+            for chunk in response.iter_content(64 * 1024):
+                body.write(chunk)
+    except DownloadError:
+        return _too_large(body, raise_error)
     except requests.exceptions.HTTPError as err:
         raise DownloadError(str(err)) from err
     except requests.exceptions.RequestException as err:
@@ -133,38 +227,50 @@ def download(url, timeout=5, raise_error=True):
     else:
         return File(
             status=result.get_status(),
-            raw=result.get_raw(),
+            raw=body.raw,
             etag=result.get_etag(),
-            date=result.get_date()
+            date=result.get_date(),
+            digest=body.digest,
+            modified=result.get_modified()
         )
 
 
-async def download_async(url, timeout=20, raise_error=True):
+async def download_async(url, timeout=20, raise_error=True, headers=None, max_size=MAX_SIZE):
     client = httpclient.AsyncHTTPClient()
+    body = ResponseBody(max_size)
     try:
         response = await client.fetch(
             url, request_timeout=timeout,
-            raise_error=raise_error,
+            raise_error=raise_error, headers=headers,
+            streaming_callback=body.write,
             ca_certs=certifi.where())
         result = TornadoParser(response)
-    except httpclient.HTTPClientError as err:
-        raise DownloadError(str(err)) from err
-    except IOError as err:
-        if raise_error:
-            raise DownloadError(type(err).__name__) from err
-        return File(599, None, None, None)  # MARK A
+    except Exception as err:  # pylint: disable=broad-except
+        if body.exceeded:  # aborted by the callback
+            return _too_large(body, raise_error)
+        if isinstance(err, httpclient.HTTPClientError):
+            raise DownloadError(str(err)) from err
+        if isinstance(err, IOError):
+            if raise_error:
+                raise DownloadError(type(err).__name__) from err
+            return File(599, None, None, None)  # MARK A
+        raise
     else:
+        if body.exceeded:  # error suppressed
+            return _too_large(body, raise_error)
         return File(
             status=result.get_status(),
-            raw=result.get_raw(),
+            raw=body.raw,
             etag=result.get_etag(),
-            date=result.get_date()
+            date=result.get_date(),
+            digest=body.digest,
+            modified=result.get_modified()
         )
 
 
 def download_mapping(url):
 
-    response = requests.get(url)
+    response = session.get(url)
     response.raise_for_status()
 
     return decoder.to_dict(
@@ -174,17 +280,161 @@ def download_mapping(url):
     )
 
 
+def _digest(mapping):
+    _bytes = json.dumps(mapping, sort_keys=True).encode()
+    return blake2b(_bytes, digest_size=16).hexdigest()
+
+
 class Downloader(UserDict):
     """
         Container for remote mapping files.
         Support dictionary-like access.
+
+        Optionally backed by a local directory.
+        Files are first loaded from the directory,
+        and then revalidated with their origins
+        using the ETag and Last-Modified headers recorded.
     """
 
+    def __init__(self, cache=None):
+        super().__init__()
+        self.cache = cache  # directory path
+        self.validators = {}  # name: (url, etag, date)
+        self.digests = {}  # name: content hash
+
+    def _path(self, name):
+        return os.path.join(self.cache, name + '.json')
+
+    def _read(self, name, url):
+
+        try:
+            with open(self._path(name), 'r') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None  # missing or corrupted
+
+        if entry.get('url') != url:
+            return None  # source changed
+
+        date = entry.get('date')
+        date = datetime.fromisoformat(date) if date else None
+        self.validators[name] = (url, entry.get('etag'), date)
+        self.digests[name] = entry.get('digest')
+
+        return entry['data']
+
+    def _write(self, name, url, file, data, digest):
+
+        os.makedirs(self.cache, exist_ok=True)
+        date = last_modified(file)
+        entry = {
+            'url': url,
+            'etag': file.etag,
+            'date': date.isoformat() if date else None,
+            'digest': digest,
+            'data': data
+        }
+        # write to a temporary file first
+        # so that readers never see partial
+        # content, replace is atomic on POSIX
+        _fd, _path = tempfile.mkstemp(dir=self.cache, suffix='.tmp')
+        with os.fdopen(_fd, 'w') as _file:
+            json.dump(entry, _file)
+        os.replace(_path, self._path(name))
+
+    def _fetch(self, name, url):
+        """
+        Download a file if it has changed since the last time.
+        Return its content as a dict and its content hash,
+        or None if the file has not been modified.
+        """
+        headers = {}
+        _url, etag, date = self.validators.get(name, (None, None, None))
+        if _url == url and name in self.data:
+            headers = conditional_headers(etag, date)
+
+        file = download(url, headers=headers)
+        if file.status == 304:
+            return None
+
+        data = decoder.to_dict(file.raw, ext=file_extension(url))
+        digest = blake2b(file.raw, digest_size=16).hexdigest()
+        self.validators[name] = (url, file.etag, last_modified(file))
+        if self.cache:
+            self._write(name, url, file, data, digest)
+
+        return data, digest
+
+    def load(self, names, urls):
+        """
+        Load files from the local directory.
+        Download the missing ones concurrently.
+        Return the names loaded from the directory.
+        """
+        names, urls = list(names), list(urls)
+        cached, missing = [], []
+
+        for name, url in zip(names, urls):
+            data = self._read(name, url) if self.cache else None
+            if data is None:
+                missing.append((name, url))
+            else:  # may be stale
+                self.data[name] = data
+                cached.append(name)
+
+        if missing:  # cannot start without them
+            self.refresh(*zip(*missing), raise_error=True)
+
+        return cached
+
+    def refresh(self, names, urls, raise_error=False, max_workers=8):
+        """
+        Revalidate files concurrently with their origins.
+        Replace the changed ones all at once when done.
+        Return the names of the files updated.
+        """
+        updates, digests = {}, {}
+        with ThreadPoolExecutor(max_workers) as executor:
+            futures = {
+                name: executor.submit(self._fetch, name, url)
+                for name, url in zip(names, urls)
+            }
+            for name, future in futures.items():
+                try:
+                    result = future.result()
+                except (DownloadError, ValueError, TypeError) as err:
+                    if raise_error:
+                        raise
+                    logger.warning("Cannot refresh %s: %s", name, err)
+                else:
+                    if result is not None:
+                        updates[name], digests[name] = result
+
+        if updates:  # swap in a new mapping
+            data = dict(self.data)
+            data.update(updates)
+            self.data = data
+            self.digests.update(digests)
+
+        return list(updates)
+
+    @property
+    def fingerprint(self):
+        """
+        A hash of the content of all files.
+        Changes whenever any file changes.
+        """
+        _hash = blake2b(digest_size=16)
+        for name in sorted(self.digests):
+            _hash.update(f"{name}:{self.digests[name]};".encode())
+        return _hash.hexdigest()
+
     def download(self, name, url):
 
         if isinstance(name, Iterable):
             for _name, _url in zip(name, url):
                 self.data[_name] = download_mapping(_url)
+                self.digests[_name] = _digest(self.data[_name])
             return
 
         if not name:  # use filename without extension
@@ -193,3 +443,4 @@ class Downloader(UserDict):
             name = name[:-len(ext)]  # TODO NOT YET TESTED
 
         self.data[name] = download_mapping(url)
+        self.digests[name] = _digest(self.data[name])
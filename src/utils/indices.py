@@ -1,19 +1,100 @@
 import json
+import logging
 import os
 
 from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import RequestError
 from elasticsearch_dsl import Index
-from model import APIDoc
+from model import APIBlob, APIDoc
 
 
 def exists():
     return Index(APIDoc.Index.name).exists()
 
 
+def update_analysis():
+    """
+    Add the analyzers defined in APIDoc to an existing index.
+    Return whether it's updated, which requires closing the index.
+    """
+    index = Index(APIDoc.Index.name)
+    analysis = APIDoc.Index.settings["analysis"]
+
+    settings = next(iter(index.get_settings().values()))
+    current = settings["settings"]["index"].get("analysis", {})
+
+    if all(
+        current.get(section, {}).get(name) == value
+        for section in analysis
+        for name, value in analysis[section].items()
+    ):
+        return False
+
+    index.close()
+    try:
+        index.put_settings(body={"analysis": analysis})
+    finally:
+        index.open()
+    return True
+
+
+# mapping parameters an existing field can change,
+# and the defaults of some that it cannot, those
+# not returned by elasticsearch when they're unset.
+UPDATABLE = (
+    'properties', 'fields', 'dynamic', 'copy_to', 'meta',
+    'ignore_above', 'ignore_malformed',
+    'search_analyzer', 'search_quote_analyzer'
+)
+DEFAULTS = {
+    'type': 'object',
+    'enabled': True,
+    'index': True
+}
+
+
+def _changed(field, existing):
+    names = (set(field) | set(DEFAULTS)).difference(UPDATABLE)
+    return any(
+        field.get(name, DEFAULTS.get(name)) !=
+        existing.get(name, DEFAULTS.get(name))
+        for name in names
+    )
+
+
+def compatible(properties, current, path=''):
+    """
+    Split mapping properties into those that can be put on
+    an index with the current properties, and the paths of
+    those that change a parameter of an existing field that
+    cannot be updated, like objects to flattened, or enabled
+    objects to disabled ones, which needs a new index.
+    """
+    result, conflicts = {}, []
+    for name, field in properties.items():
+        existing = current.get(name)
+        if existing is None:  # new field
+            result[name] = field
+        elif _changed(field, existing):
+            conflicts.append(path + name)
+        else:  # new subfields maybe
+            field = dict(field)
+            for key in ('properties', 'fields'):
+                if key in field:
+                    field[key], _conflicts = compatible(
+                        field[key], existing.get(key, {}),
+                        path + name + '.')
+                    conflicts.extend(_conflicts)
+            result[name] = field
+    return result, conflicts
+
+
 def setup():
     """
     Setup Elasticsearch Index with dynamic template.
     Run it on an open index to update dynamic mapping.
+    Fields that cannot change on an existing index are
+    left as they are, see admin.remap.
     """
     _dirname = os.path.dirname(__file__)
     with open(os.path.join(_dirname, 'mapping.json'), 'r') as file:
@@ -21,16 +102,82 @@ def setup():
 
     if not exists():
         APIDoc.init()
+    else:
+        update_analysis()
+
+    # created, or fields added
+    # since index creation
+    APIBlob.init()
 
     elastic = Elasticsearch()
-    elastic.indices.put_mapping(
-        index=APIDoc.Index.name,
-        body=mapping
-    )
+    before = elastic.indices.get_mapping(index=APIDoc.Index.name)
+
+    # fields added to APIDoc
+    # since index creation
+    index = Index(APIDoc.Index.name)
+    index.document(APIDoc)
+
+    conflicts = []
+    for body in (index.to_dict()["mappings"], mapping):
+        current = elastic.indices.get_mapping(index=APIDoc.Index.name)
+        current = next(iter(current.values()))["mappings"].get("properties", {})
+        body = dict(body)
+        body["properties"], _conflicts = compatible(body.get("properties", {}), current)
+        conflicts.extend(_conflicts)
+        try:
+            elastic.indices.put_mapping(index=APIDoc.Index.name, body=body)
+        except RequestError:  # keep serving with the current mapping
+            logging.exception("Cannot update mapping.")
+
+    if conflicts:
+        logging.warning(
+            "Fields %s keep their current mapping, see admin.remap.",
+            sorted(set(conflicts)))
+
+    after = elastic.indices.get_mapping(index=APIDoc.Index.name)
+
+    if before != after:  # index existing documents in the new fields
+        elastic.update_by_query(
+            index=APIDoc.Index.name,
+            conflicts='proceed'
+        )
+
+
+def count_fields(properties):
+    """
+    Count the fields of a mapping, as they count
+    towards mapping.total_fields.limit, including
+    objects and multi-fields.
+    """
+    count = 0
+    for field in properties.values():
+        count += 1
+        count += count_fields(field.get('properties', {}))
+        count += count_fields(field.get('fields', {}))
+    return count
+
+
+def stats(name=APIDoc.Index.name):
+    """
+    Report the number of documents, mapped fields
+    and store size of an index, to keep track of
+    the mapping growth as documents are registered.
+    """
+    elastic = Elasticsearch()
+    mapping = elastic.indices.get_mapping(index=name)
+    mapping = next(iter(mapping.values()))["mappings"]
+    _stats = elastic.indices.stats(index=name, metric="docs,store")
+    _stats = _stats["_all"]["primaries"]
+    return {
+        "docs": _stats["docs"]["count"],
+        "fields": count_fields(mapping.get("properties", {})),
+        "size": _stats["store"]["size_in_bytes"]
+    }
 
 
 def delete():
     Index(APIDoc.Index.name).delete()
+    Index(APIBlob.Index.name).delete(ignore=404)
 
 
 def reset():
@@ -16,6 +16,8 @@ import requests
 # pylint:disable=import-error, ungrouped-imports
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
+from utils.sessions import session
+
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)  # pylint:disable=no-member
 
 
@@ -136,11 +138,11 @@ class Endpoint:
                     elif _param['in'] == 'query':
                         params = {_param['name']: _param['example']}
                     try:
-                        response = requests.get(url,
-                                                params=params,
-                                                verify=False,
-                                                timeout=10,
-                                                headers=headers)
+                        response = session.get(url,
+                                               params=params,
+                                               verify=False,
+                                               timeout=10,
+                                               headers=headers)
                         return response
                     except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
                         pass
@@ -148,10 +150,10 @@ class Endpoint:
                     example = True
             if not example:
                 try:
-                    response = requests.get(url,
-                                            timeout=10,
-                                            verify=False,
-                                            headers=headers)
+                    response = session.get(url,
+                                           timeout=10,
+                                           verify=False,
+                                           headers=headers)
                     return response
                 except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
                     pass
@@ -166,11 +168,11 @@ class Endpoint:
                     elif _param['in'] == 'query':
                         data = {_param['name']: _param['example']}
                     try:
-                        response = requests.post(url,
-                                                 data=data,
-                                                 timeout=10,
-                                                 verify=False,
-                                                 headers=headers)
+                        response = session.post(url,
+                                                data=data,
+                                                timeout=10,
+                                                verify=False,
+                                                headers=headers)
                         return response
                     except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
                         pass
@@ -186,11 +188,11 @@ class Endpoint:
                         if example:
                             logger.debug(url)
                             try:
-                                response = requests.post(url,
-                                                         timeout=10,
-                                                         json=example,
-                                                         verify=False,
-                                                         headers=headers)
+                                response = session.post(url,
+                                                        timeout=10,
+                                                        json=example,
+                                                        verify=False,
+                                                        headers=headers)
                                 return response
                             except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
                                 pass
@@ -204,11 +206,11 @@ class Endpoint:
                                 logger.debug('example %s', example)
                                 if example:
                                     try:
-                                        response = requests.post(url,
-                                                                 timeout=10,
-                                                                 json=example,
-                                                                 verify=False,
-                                                                 headers=headers)
+                                        response = session.post(url,
+                                                                timeout=10,
+                                                                json=example,
+                                                                verify=False,
+                                                                headers=headers)
                                         logger.debug(response)
                                         return response
                                     except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
@@ -216,10 +218,10 @@ class Endpoint:
 
             if not example:
                 try:
-                    response = requests.post(url,
-                                             timeout=10,
-                                             verify=False,
-                                             headers=headers)
+                    response = session.post(url,
+                                            timeout=10,
+                                            verify=False,
+                                            headers=headers)
                     return response
                 except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
                     pass
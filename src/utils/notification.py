@@ -1,7 +1,21 @@
 """
     API Registration Slack Notification Message
     https://api.slack.com/messaging/composing/layouts
+
+    Messages are delivered in the background by a Dispatcher,
+    so that requests don't wait for the webhooks, see handlers.
+
+    dispatcher = Dispatcher(post_json)
+    dispatcher.notify(webhook, SlackNewAPIMessage(...))
+
 """
+import asyncio
+import json
+import logging
+
+from tornado.httpclient import AsyncHTTPClient
+
+logger = logging.getLogger(__name__)
 
 
 class SlackNewAPIMessage():
@@ -61,6 +75,163 @@ class SlackNewTranslatorAPIMessage(SlackNewAPIMessage):
         }
 
 
+class SlackDigestMessage():
+    """
+        Multiple registrations in one message,
+        within the limit of 50 blocks per message.
+    """
+
+    MAX_MESSAGES = 12  # of 4 blocks
+
+    def __init__(self, messages):
+        self.messages = messages
+
+    def compose(self):
+        blocks = []
+        for message in self.messages[:self.MAX_MESSAGES]:
+            blocks.extend(message.compose()["blocks"])
+            blocks.append({"type": "divider"})
+        if len(self.messages) > self.MAX_MESSAGES:
+            blocks.append({"type": "section", "text": {
+                "type": "mrkdwn",
+                "text": f"And {len(self.messages) - self.MAX_MESSAGES} more."
+            }})
+        return {
+            "text": f"{len(self.messages)} new APIs have been registered on Smart-API.info",
+            "blocks": blocks
+        }
+
+
+# -------------
+#   Delivery
+# -------------
+
+
+async def post_json(url, payload):
+    """ Send a message to a webhook. """
+    await AsyncHTTPClient().fetch(
+        url, method='POST', request_timeout=10,
+        headers={'content-type': 'application/json'},
+        body=json.dumps(payload))
+
+
+class LocalSink():
+    """
+        Record messages instead of sending them,
+        failing the first number of calls, for tests.
+    """
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.payloads = []  # (url, payload)
+        self.calls = 0
+
+    async def __call__(self, url, payload):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Local sink failure.")
+        self.payloads.append((url, payload))
+
+
+class Dispatcher():
+    """
+        Deliver messages to webhooks in the background,
+        from a bounded queue, by concurrent workers, retrying
+        failed deliveries with exponential backoff. Messages
+        to a webhook within the digest window, in seconds,
+        are sent together. Start and use on an event loop.
+    """
+
+    def __init__(self, sink, maxsize=1000, concurrency=4,
+                 retries=5, backoff=1.0, digest=0.0):
+        self.sink = sink  # async (url, payload)
+        self.maxsize = maxsize
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff  # seconds
+        self.digest = digest  # seconds
+        self._queue = None
+        self._workers = []
+        self._pending = {}  # url: [messages]
+        self._timers = {}  # url: handle
+
+    def _start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.maxsize)
+            self._workers = [
+                asyncio.ensure_future(self._work())
+                for _ in range(self.concurrency)
+            ]
+
+    def notify(self, url, message):
+        """
+        Queue a message without waiting for its delivery.
+        Messages are dropped when the queue is full.
+        """
+        self._start()
+        if not self.digest:
+            self._put(url, [message])
+            return
+        self._pending.setdefault(url, []).append(message)
+        if url not in self._timers:
+            loop = asyncio.get_event_loop()
+            self._timers[url] = loop.call_later(self.digest, self._release, url)
+
+    def _release(self, url):
+        self._timers.pop(url, None)
+        self._put(url, self._pending.pop(url, []))
+
+    def _put(self, url, messages):
+        try:
+            self._queue.put_nowait((url, messages))
+        except asyncio.QueueFull:
+            logger.error("Notification queue full, dropped %s message(s).", len(messages))
+
+    async def _work(self):
+        while True:
+            url, messages = await self._queue.get()
+            try:
+                await self._deliver(url, messages)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Notification delivery failed.")
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, url, messages):
+        if len(messages) == 1:
+            payload = messages[0].compose()
+        else:
+            payload = SlackDigestMessage(messages).compose()
+        for attempt in range(self.retries + 1):
+            try:
+                await self.sink(url, payload)
+                return
+            except Exception as exc:  # pylint: disable=broad-except
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logger.warning("Notification failed, retry in %ss: %s", delay, exc)
+                await asyncio.sleep(delay)
+
+    async def join(self):
+        """
+        Send the messages waiting for their digests
+        and wait until all messages are delivered.
+        """
+        for url in list(self._timers):
+            self._timers[url].cancel()
+            self._release(url)
+        if self._queue is not None:
+            await self._queue.join()
+
+    def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        self._queue = None
+
+
 # -------------
 #    Tests
 # -------------
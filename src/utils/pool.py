@@ -0,0 +1,114 @@
+"""
+    Process Pool for CPU-bound Jobs
+
+    pool = ProcessPool(processes=2, timeout=30, memory=2 * 1024 ** 3)
+    result = await pool.run(func, *args)
+
+    With zero processes, jobs run in the calling process.
+
+    # workers forked again when the state they inherit changes
+    pool = ProcessPool(processes=2, state=fingerprint)
+
+"""
+import asyncio
+import logging
+import resource
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolError(Exception):
+    """Error running a job in the pool"""
+
+
+class _Timeout(BaseException):
+    # not an Exception so that it is not
+    # swallowed by the job's error handling
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise _Timeout()
+
+
+def _initialize(memory):
+    # the limit applies to the address space of the worker
+    # process, which includes what it inherited when forked.
+    if memory:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+
+def _run(func, args, timeout):
+    if timeout:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return func(*args)
+    except _Timeout:
+        raise PoolError(f"Exceeded the time budget of {timeout}s.")
+    except MemoryError:
+        raise PoolError("Exceeded the memory limit.")
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class ProcessPool():
+    """
+        Run jobs in worker processes off the event loop.
+        Each job has a time budget and a memory limit.
+        Workers keep what they inherited when forked, a
+        state function identifies it, when its value
+        changes, new workers are forked for new jobs.
+    """
+
+    def __init__(self, processes=0, timeout=None, memory=None, state=None):
+        self.processes = processes
+        self.timeout = timeout  # seconds
+        self.memory = memory  # bytes
+        self.state = state  # callable
+        self._executor = None
+        self._state = None  # of the workers
+
+    def _get_executor(self):
+        state = self.state() if self.state else None
+        if self._executor and state != self._state:
+            # jobs submitted already finish
+            # in the workers they're sent to.
+            self.shutdown()
+        if not self._executor:
+            self._executor = ProcessPoolExecutor(
+                self.processes, initializer=_initialize,
+                initargs=(self.memory,))
+            self._state = state
+        return self._executor
+
+    async def run(self, func, *args):
+        """
+        Run func(*args) and return the result.
+        Exceptions raised by func propagate.
+        Raise PoolError when a limit is exceeded.
+        """
+        if not self.processes:
+            return func(*args)
+
+        loop = asyncio.get_event_loop()
+        future = loop.run_in_executor(
+            self._get_executor(), _run,
+            func, args, self.timeout)
+        try:
+            return await future
+        except BrokenProcessPool as err:
+            # a worker died, for example killed by the os,
+            # the executor cannot be used anymore, replace it.
+            logger.error("Process pool broken: %s", err)
+            self.shutdown()
+            raise PoolError("Job terminated unexpectedly.") from err
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,111 @@
+"""
+    Shared HTTP Sessions
+
+    Blocking requests of the application, downloads and uptime
+    checks, share a session, so that those to the same hosts
+    reuse connections, kept alive in a pool per host. Count the
+    connections opened and the requests reusing them.
+
+    from utils.sessions import session
+
+    response = session.get(url)
+    session.stats()
+
+"""
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# hosts with a connection pool, least recently used
+# ones are closed, connections kept alive per host,
+# and seconds to wait when the callers don't specify.
+POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '64'))
+POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '8'))
+TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '10'))
+
+
+class Counters():
+
+    def __init__(self):
+        self.requests = 0
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def _counting(pool_class, counters):
+
+    class ConnectionPool(pool_class):
+
+        def _new_conn(self):
+            counters.count('opened')
+            return super()._new_conn()
+
+    return ConnectionPool
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+        Transport adapter counting the connections
+        opened, with a default timeout for requests.
+    """
+
+    def __init__(self, pool_hosts=POOL_HOSTS, pool_size=POOL_SIZE, timeout=TIMEOUT):
+        self.counters = Counters()
+        self.timeout = timeout
+        super().__init__(pool_connections=pool_hosts, pool_maxsize=pool_size)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting(HTTPConnectionPool, self.counters),
+            'https': _counting(HTTPSConnectionPool, self.counters)
+        }
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        self.counters.count('requests')
+        return super().send(request, **kwargs)
+
+
+class Session(requests.Session):
+    """
+        Thread-safe for the requests made here.
+        Cookies are not kept, requests are unrelated.
+    """
+
+    def __init__(self, pool_hosts=POOL_HOSTS, pool_size=POOL_SIZE, timeout=TIMEOUT):
+        super().__init__()
+        self.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        self.adapter = PooledAdapter(pool_hosts, pool_size, timeout)
+        self.mount('http://', self.adapter)
+        self.mount('https://', self.adapter)
+
+    def reset(self):
+        """
+        Close the connections, for example in a child
+        process, which must not use those of its parent.
+        """
+        self.adapter.poolmanager.clear()
+
+    def stats(self):
+        counters = self.adapter.counters
+        return {
+            "requests": counters.requests,
+            "opened": counters.opened,
+            "reused": max(counters.requests - counters.opened, 0)
+        }
+
+
+session = Session()
+
+if hasattr(os, 'register_at_fork'):  # see utils.pool
+    os.register_at_fork(after_in_child=session.reset)